@@ -0,0 +1,89 @@
+"""Micro-benchmark per-call overhead of the hot crud read paths.
+
+Compares the legacy ``db.query(...).filter(...).first()`` pattern against the
+``select()``/``Session.get`` implementations in ``src/db/crud.py`` on an
+in-memory SQLite database.
+
+    python benchmarks/crud_overhead.py
+"""
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from src.db.database import Base
+from src.db import crud, models
+
+PATIENTS = 1000
+SESSIONS_PER_PATIENT = 20
+CALLS = 2000
+
+def legacy_get_patient(db, patient_id):
+    return db.query(models.Patient).filter(models.Patient.id == patient_id).first()
+
+def legacy_get_prescription(db, prescription_id):
+    return db.query(models.Prescription).filter(models.Prescription.id == prescription_id).first()
+
+def legacy_get_patient_progress(db, patient_id):
+    return db.query(models.Progress).filter(
+        models.Progress.patient_id == patient_id
+    ).order_by(models.Progress.date.desc()).all()
+
+def seed(Session):
+    db = Session()
+    start = datetime(2024, 1, 1)
+    for i in range(PATIENTS):
+        patient = models.Patient(name=f"Patient {i}", age=40 + i % 50, risk_factors=[], goals=[])
+        prescription = models.Prescription(
+            patient=patient, exercises=[], frequency="3 times per week", duration="30 minutes", notes=""
+        )
+        db.add(patient)
+        db.add_all(
+            models.Progress(
+                patient=patient, prescription=prescription, date=start + timedelta(days=d),
+                duration=30, difficulty_level=3, pain_level=2
+            )
+            for d in range(SESSIONS_PER_PATIENT)
+        )
+    db.commit()
+    db.close()
+
+def per_call_us(fn, calls=CALLS):
+    return min(timeit.repeat(fn, number=calls, repeat=3)) / calls * 1e6
+
+def main():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    seed(Session)
+
+    db = Session()
+    # Warm the identity map the way a page does after its first lookup; the
+    # session only holds weak references, so keep the objects alive
+    patient = crud.get_patient(db, 1)
+    prescription = crud.get_prescription(db, 1)
+
+    cases = [
+        ("get_patient (cached)", lambda: legacy_get_patient(db, 1), lambda: crud.get_patient(db, 1)),
+        ("get_prescription (cached)", lambda: legacy_get_prescription(db, 1), lambda: crud.get_prescription(db, 1)),
+        ("get_patient_progress", lambda: legacy_get_patient_progress(db, 7), lambda: crud.get_patient_progress(db, 7)),
+    ]
+
+    print(f"{'query':<28}{'legacy us/call':>16}{'current us/call':>18}{'speedup':>10}")
+    for name, legacy, current in cases:
+        before = per_call_us(legacy)
+        after = per_call_us(current)
+        print(f"{name:<28}{before:>16.1f}{after:>18.1f}{before / after:>9.1f}x")
+
+    del patient, prescription
+    db.close()
+
+if __name__ == "__main__":
+    main()
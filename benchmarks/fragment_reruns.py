@@ -0,0 +1,100 @@
+"""Measure reruns and queries per interaction on the form and fragment pages.
+
+Drives the app with Streamlit's AppTest against a throwaway database and reads
+the per-scope counters kept by ``src.profiling.counted``. Before the pages were
+split into forms and fragments every widget change re-ran ``main``; now a form
+widget reruns nothing until it is submitted and other widgets rerun only their
+fragment. AppTest always executes the whole script, so the cost of a
+fragment-only rerun is taken from that fragment's own counter.
+
+    python benchmarks/fragment_reruns.py
+"""
+import os
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+SESSIONS = 60
+
+def interact(at, action):
+    """Run one interaction; return the new AppTest and per-scope (runs, queries, ms) deltas"""
+    before = {scope: dict(counts) for scope, counts in at.session_state["run_stats"].items()}
+    at = action().run()
+    deltas = {}
+    for scope, counts in at.session_state["run_stats"].items():
+        previous = before.get(scope, {"runs": 0, "queries": 0, "seconds": 0.0})
+        deltas[scope] = (
+            counts["runs"] - previous["runs"],
+            counts["queries"] - previous["queries"],
+            (counts["seconds"] - previous["seconds"]) * 1000
+        )
+    return at, deltas
+
+def main():
+    tmp = tempfile.mkdtemp()
+    os.environ["EAM_DB_PATH"] = os.path.join(tmp, "bench.db")
+    os.environ["EAM_SHARD_DIR"] = os.path.join(tmp, "clinics")
+    os.environ.setdefault("EAM_SQL_ECHO", "0")
+    os.chdir(PROJECT_ROOT)
+
+    from streamlit.testing.v1 import AppTest
+
+    rows = []
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        at = AppTest.from_string("from src.app import main\nmain()", default_timeout=120).run()
+
+        # Patient Profile: fill and submit the new-patient form
+        at.text_input[0].input("Bench Patient")
+        at.number_input[0].set_value(70)
+        at = [b for b in at.button if b.label == "Save Profile"][0].click().run()
+        at = at.run()  # the patient list renders above the form, so it shows the new patient next run
+        at, deltas = interact(at, lambda: at.selectbox(key="patient_selector").select_index(0))
+        rows.append(("select patient", "show_patient_selector", deltas))
+
+        # Exercise Prescription: condition picks, then submit the details form
+        at = at.sidebar.selectbox[0].set_value("Exercise Prescription").run()
+        at, deltas = interact(at, lambda: at.multiselect[0].set_value(["Fall Prevention"]))
+        rows.append(("pick condition", "show_prescription_builder", deltas))
+        at = [b for b in at.button if b.label == "Generate Prescription"][0].click().run()
+
+        # Progress Tracking: record a history, then interact with the form and chart panel
+        at = at.sidebar.selectbox[0].set_value("Progress Tracking").run()
+        today = date.today()
+        for n in range(SESSIONS):
+            at.date_input[0].set_value(today - timedelta(days=2 * n))
+            at.number_input[0].set_value(20 + n % 15)
+            at.slider[1].set_value(n % 6)
+            at, deltas = interact(at, [b for b in at.button if b.label == "Record Progress"][0].click)
+        submit = deltas
+
+        # A widget inside a form never reaches the server until submit, so there is no
+        # "now" cost to measure. AppTest re-runs the whole script for it anyway, which
+        # is the full rerun every widget change used to cost.
+        at, slider = interact(at, lambda: at.slider[1].set_value(3))
+
+        at, deltas = interact(at, lambda: at.date_input(key="progress_window").set_value((today - timedelta(days=30), today)))
+        rows.append(("change date range", "show_progress_charts", deltas))
+
+    # AppTest re-executes main for every interaction, which is what every widget used to do
+    header = f"{'interaction':<20}{'full rerun':>22}{'now reruns':>30}{'now':>22}"
+    print(header)
+    print("-" * len(header))
+    _, full_queries, full_ms = slider["main"]
+    print(f"{'move pain slider':<20}{full_queries:>6} queries {full_ms:>5.0f} ms"
+          f"{'nothing until submit (form)':>30}")
+    for label, scope, deltas in rows:
+        _, main_queries, main_ms = deltas["main"]
+        runs, queries, ms = deltas[scope]
+        print(f"{label:<20}{main_queries:>6} queries {main_ms:>5.0f} ms"
+              f"{scope:>30}{queries // runs:>6} queries {ms / runs:>5.0f} ms")
+    # A submit writes in the entry fragment, then reruns the app once so the charts pick it up
+    _, queries, ms = submit["main"]
+    print(f"{'submit session':<20}{'':>22}{'entry fragment + main':>30}{queries:>6} queries {ms:>5.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Headless load test simulating concurrent clinicians against ``app.main``.
+
+Each simulated clinician drives its own Streamlit ``AppTest`` session through
+the three pages: create a patient, generate a prescription, then record
+progress several times. Sessions run in parallel threads or processes against
+a freshly seeded SQLite database, and every rerun is timed.
+
+    python benchmarks/load_test.py --clinicians 30 --workers 30
+    python benchmarks/load_test.py --clinicians 50 --workers 8 --mode process
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+APP_SCRIPT = "from src.app import main\nmain()\n"
+RERUN_TIMEOUT = 120
+
+def seed_database(path: str, patients: int) -> None:
+    """Create the schema and a starting population in a fresh database file"""
+    os.environ["EAM_DB_PATH"] = path
+    os.environ["EAM_SQL_ECHO"] = "0"
+    from src.db.database import SessionLocal, init_db
+    from src.db import crud
+
+    init_db()
+    db = SessionLocal()
+    try:
+        for i in range(patients):
+            patient = crud.create_patient(db, f"Seed Patient {i}", 50 + i % 40, ["Diabetes"], ["Improve Balance"])
+            crud.create_prescription(db, patient.id, [], "3 times per week", "30 minutes", "")
+    finally:
+        db.close()
+
+def _find_button(at, label):
+    return next(button for button in at.button if button.label == label)
+
+def simulate_clinician(clinician: int, progress_entries: int) -> dict:
+    """Script one clinician's flow and time every rerun"""
+    from streamlit.testing.v1 import AppTest
+
+    timings = []
+    lock_errors = 0
+    errors = []
+
+    def rerun(action):
+        nonlocal lock_errors
+        started = time.perf_counter()
+        at = action()
+        timings.append(time.perf_counter() - started)
+        messages = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+        for message in messages:
+            if "locked" in message.lower():
+                lock_errors += 1
+            else:
+                errors.append(message)
+        return at
+
+    try:
+        at = AppTest.from_string(APP_SCRIPT, default_timeout=RERUN_TIMEOUT)
+        rerun(at.run)
+
+        # Patient Profile: create a patient
+        at.text_input[0].input(f"Load Patient {clinician}")
+        at.number_input[0].set_value(60 + clinician % 30)
+        rerun(_find_button(at, "Save Profile").click().run)
+
+        # Exercise Prescription: pick conditions and save
+        rerun(at.sidebar.selectbox[0].set_value("Exercise Prescription").run)
+        rerun(at.multiselect[0].set_value(["Fall Prevention", "Pain Management"]).run)
+        rerun(_find_button(at, "Generate Prescription").click().run)
+
+        # Progress Tracking: record sessions
+        rerun(at.sidebar.selectbox[0].set_value("Progress Tracking").run)
+        for entry in range(progress_entries):
+            at.number_input[0].set_value(20 + entry)
+            rerun(_find_button(at, "Record Progress").click().run)
+    except Exception as e:
+        errors.append(f"{type(e).__name__}: {e}")
+
+    return {"timings": timings, "lock_errors": lock_errors, "errors": errors}
+
+def simulate_clinicians(clinicians: list, progress_entries: int) -> list:
+    """Run several clinicians back to back in one worker process.
+
+    AppTest executes the app as ``__main__``, which breaks unpickling of any
+    further tasks sent to the same process, so each process gets one batch.
+    """
+    return [simulate_clinician(clinician, progress_entries) for clinician in clinicians]
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+def run_load_test(clinicians: int, workers: int, mode: str, progress_entries: int, seed_patients: int) -> dict:
+    """Run all simulated clinicians and aggregate latency, throughput and errors"""
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_database(os.path.join(tmp, "load_test.db"), seed_patients)
+
+        started = time.perf_counter()
+        if mode == "process":
+            # Spawned workers start clean instead of inheriting forked engine connections
+            batches = [list(range(clinicians))[i::workers] for i in range(min(workers, clinicians))]
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=len(batches), mp_context=context) as executor:
+                results = [
+                    result
+                    for batch in executor.map(simulate_clinicians, batches, [progress_entries] * len(batches))
+                    for result in batch
+                ]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(
+                    simulate_clinician, range(clinicians), [progress_entries] * clinicians
+                ))
+        elapsed = time.perf_counter() - started
+
+    timings = [t for result in results for t in result["timings"]]
+    return {
+        "clinicians": clinicians,
+        "reruns": len(timings),
+        "elapsed": elapsed,
+        "p50": percentile(timings, 50) if timings else 0.0,
+        "p95": percentile(timings, 95) if timings else 0.0,
+        "p99": percentile(timings, 99) if timings else 0.0,
+        "mean": statistics.fmean(timings) if timings else 0.0,
+        "throughput": len(timings) / elapsed,
+        "lock_errors": sum(result["lock_errors"] for result in results),
+        "errors": [error for result in results for error in result["errors"]],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clinicians", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--progress-entries", type=int, default=3)
+    parser.add_argument("--seed-patients", type=int, default=200)
+    args = parser.parse_args()
+
+    report = run_load_test(
+        args.clinicians, args.workers, args.mode, args.progress_entries, args.seed_patients
+    )
+
+    print(f"Clinicians: {report['clinicians']} ({args.mode} mode, {args.workers} workers)")
+    print(f"Reruns: {report['reruns']} in {report['elapsed']:.1f} s "
+          f"({report['throughput']:.1f} reruns/s)")
+    print(f"Latency p50/p95/p99: {report['p50'] * 1000:.0f} / {report['p95'] * 1000:.0f} / "
+          f"{report['p99'] * 1000:.0f} ms (mean {report['mean'] * 1000:.0f} ms)")
+    print(f"Lock errors: {report['lock_errors']}")
+    print(f"Other errors: {len(report['errors'])}")
+    for error in report["errors"][:10]:
+        print(f"  - {error}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Measure connection setup time saved per interaction by the pooled, per-rerun session.
+
+An "interaction" replays the queries of one Patient Profile rerun. The legacy
+pattern opens a fresh session for each block of the page on an unpooled
+engine; the current pattern shares one scoped session per rerun on the
+pooled engine configured in ``src/db/database.py``.
+
+    python benchmarks/session_pool.py
+"""
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
+from src.db.database import Base, POOL_MAX_OVERFLOW, POOL_SIZE, SQLITE_BUSY_TIMEOUT_MS
+from src.db import crud, models
+
+INTERACTIONS = 500
+PATIENTS = 200
+
+def make_engine(url, pooled):
+    pool_args = (
+        {"poolclass": QueuePool, "pool_size": POOL_SIZE, "max_overflow": POOL_MAX_OVERFLOW}
+        if pooled else {"poolclass": NullPool}
+    )
+    engine = create_engine(url, connect_args={"check_same_thread": False}, **pool_args)
+    stats = {"connects": 0}
+
+    @event.listens_for(engine, "connect")
+    def configure(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+        stats["connects"] += 1
+
+    return engine, stats
+
+def profile_page_queries(db):
+    patients = crud.list_all_patients(db)
+    crud.get_patient(db, patients[0].id)
+    crud.get_weekly_adherence(db)
+
+def legacy_interaction(Session):
+    # Each page block opened and closed its own session
+    for _ in range(3):
+        db = Session()
+        try:
+            profile_page_queries(db)
+        finally:
+            db.close()
+
+def scoped_interaction(Scoped):
+    db = Scoped()
+    try:
+        for _ in range(3):
+            profile_page_queries(db)
+    finally:
+        Scoped.remove()
+
+def run(stats, interaction, factory):
+    """Average seconds and new connections per interaction"""
+    stats["connects"] = 0
+    # Silence the per-call listing output of list_all_patients
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        started = time.perf_counter()
+        for _ in range(INTERACTIONS):
+            interaction(factory)
+        elapsed = time.perf_counter() - started
+    return elapsed / INTERACTIONS, stats["connects"] / INTERACTIONS
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed_engine, _ = make_engine(url, pooled=True)
+        Base.metadata.create_all(seed_engine)
+        with sessionmaker(bind=seed_engine)() as db:
+            db.add_all(
+                models.Patient(name=f"Patient {i}", age=60, risk_factors=[], goals=[])
+                for i in range(PATIENTS)
+            )
+            db.commit()
+        seed_engine.dispose()
+
+        legacy_engine, legacy_stats = make_engine(url, pooled=False)
+        pooled_engine, pooled_stats = make_engine(url, pooled=True)
+        cases = [
+            ("legacy (session per block)", legacy_stats, legacy_interaction,
+             sessionmaker(bind=legacy_engine, autoflush=False)),
+            ("pooled (scoped per rerun)", pooled_stats, scoped_interaction,
+             scoped_session(sessionmaker(bind=pooled_engine, autoflush=False))),
+        ]
+
+        print(f"{'pattern':<28}{'ms/interaction':>16}{'connects/interaction':>22}")
+        timings = []
+        for label, stats, interaction, factory in cases:
+            seconds, connects = run(stats, interaction, factory)
+            timings.append(seconds)
+            print(f"{label:<28}{seconds * 1000:>16.3f}{connects:>22.2f}")
+        print(f"saved per interaction: {(timings[0] - timings[1]) * 1000:.3f} ms")
+
+        legacy_engine.dispose()
+        pooled_engine.dispose()
+
+if __name__ == "__main__":
+    main()
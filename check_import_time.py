@@ -0,0 +1,121 @@
+"""Cold-start budget for the Patient Profile page.
+
+Seeds a throwaway database with a patient, prescription and session so every
+table on the page has rows, then renders the page once with Streamlit's
+AppTest in a fresh ``python -X importtime`` process. Prints a per-package
+import summary and exits non-zero when the render goes over budget or a
+deferred heavy dependency is loaded by the page.
+
+    python check_import_time.py
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+
+# Runs in a fresh process so nothing the page needs is imported ahead of the render
+SEED_DATABASE = """
+from datetime import datetime
+from src.db.database import SessionLocal, init_db
+from src.db import crud
+init_db()
+with SessionLocal() as db:
+    patient = crud.create_patient(db, "Import Check", 70, ["Diabetes"], ["Weight Loss"])
+    prescription = crud.create_prescription(db, patient.id, [], "3 times per week", "30 minutes", "")
+    crud.record_progress(db, patient.id, prescription.id, datetime.now(), 30, 3, 1, "")
+"""
+
+RENDER_PROFILE_PAGE = """
+import json, os, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_string("from src.app import main\\nmain()", default_timeout=120).run()
+elapsed_ms = (time.perf_counter() - started) * 1000
+with open(os.environ["IMPORT_CHECK_RESULT"], "w") as f:
+    json.dump({"ms": elapsed_ms, "errors": [str(e.value) for e in at.exception], "modules": sorted(sys.modules)}, f)
+"""
+
+# Budget for the profile page cold start (imports plus first render), in milliseconds
+PROFILE_PAGE_BUDGET_MS = float(os.environ.get("PROFILE_IMPORT_BUDGET_MS", 3000))
+
+# Heavy modules that must only load with the page or tab that needs them. pandas,
+# numpy and pyarrow are not listed: st.dataframe needs them for the roster and
+# at-risk tables on this page.
+DEFERRED_MODULES = ["altair", "src.visualizations", "src.recommendations"]
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def render_profile_page() -> tuple:
+    """Render the page in a fresh process; return (result, importtime entries)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "EAM_DB_PATH": os.path.join(tmp, "import_check.db"),
+            "EAM_SHARD_DIR": os.path.join(tmp, "clinics"),
+            "EAM_SQL_ECHO": "0",
+            "IMPORT_CHECK_RESULT": os.path.join(tmp, "result.json"),
+        }
+        subprocess.run(
+            [sys.executable, "-c", SEED_DATABASE], cwd=PROJECT_ROOT, env=env, capture_output=True, check=True
+        )
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", RENDER_PROFILE_PAGE],
+            cwd=PROJECT_ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        with open(env["IMPORT_CHECK_RESULT"]) as f:
+            render = json.load(f)
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((int(self_us), int(cumulative_us), (len(indent) - 1) // 2, module))
+    return render, entries
+
+def summarize(entries: list, top: int = 10) -> list:
+    """Self time per top-level package, slowest first"""
+    totals = defaultdict(int)
+    for self_us, _, _, module in entries:
+        totals[module.split(".")[0]] += self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+def check_profile_page_imports() -> bool:
+    """Check the profile page cold start against its budget"""
+    render, entries = render_profile_page()
+    import_ms = sum(cumulative for _, cumulative, depth, _ in entries if depth == 0) / 1000
+
+    print("=== Profile page cold start ===")
+    print(f"{'package':<30}{'self ms':>10}")
+    for package, self_us in summarize(entries):
+        print(f"{package:<30}{self_us / 1000:>10.1f}")
+    print(f"\nImports: {import_ms:.1f} ms")
+    print(f"Render including imports: {render['ms']:.1f} ms (budget {PROFILE_PAGE_BUDGET_MS:.0f} ms)")
+
+    ok = True
+    if render["errors"]:
+        print(f"FAIL: profile page raised: {'; '.join(render['errors'])}")
+        ok = False
+    if render["ms"] > PROFILE_PAGE_BUDGET_MS:
+        print("FAIL: profile page cold start is over budget")
+        ok = False
+    eager = [module for module in DEFERRED_MODULES if module in render["modules"]]
+    if eager:
+        print(f"FAIL: deferred modules loaded by the profile page: {', '.join(eager)}")
+        ok = False
+    if ok:
+        print("OK")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if check_profile_page_imports() else 1)
@@ -0,0 +1,110 @@
+"""End-to-end check of offline capture and batched sync between two database files.
+
+Creates a throwaway clinic database and a client journal in a temp directory,
+queues thousands of sessions offline, syncs them, replays a batch whose
+acknowledgement was lost and verifies that nothing is merged twice and that
+adherence counters and alert state count every merged session exactly once.
+
+    python check_offline_sync.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+os.environ.setdefault("EAM_SQL_ECHO", "0")
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+from src.adherence import week_start
+from src.db.database import Base, create_sqlite_engine
+from src.db import crud, models
+from src.offline import ProgressJournal, sync_journal
+
+PATIENTS = 50
+QUEUED_SESSIONS = 3000
+REPLAYED_SESSIONS = 200
+
+def check(condition: bool, message: str, failures: list) -> None:
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+def main() -> int:
+    failures = []
+    rnd = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        server_engine = create_sqlite_engine(f"sqlite:///{os.path.join(tmp, 'clinic.db')}")
+        Base.metadata.create_all(bind=server_engine)
+        Server = sessionmaker(autoflush=False, bind=server_engine)
+        journal = ProgressJournal(os.path.join(tmp, 'device_journal.db'))
+
+        with Server() as db:
+            prescriptions = {}
+            for i in range(PATIENTS):
+                patient = crud.create_patient(db, f"Offline {i}", 60, [], [])
+                prescription = crud.create_prescription(db, patient.id, [], "3 times per week", "30 minutes", "")
+                prescriptions[patient.id] = prescription.id
+
+        # Capture sessions offline, plus a few the server must reject
+        start = datetime(2024, 1, 1)
+        patient_ids = list(prescriptions)
+        for _ in range(QUEUED_SESSIONS):
+            patient_id = rnd.choice(patient_ids)
+            journal.record(
+                patient_id, prescriptions[patient_id], start + timedelta(days=rnd.randint(0, 120)),
+                rnd.randint(10, 45), rnd.randint(1, 5), rnd.randint(0, 6), "captured offline"
+            )
+        journal.record(patient_ids[0], prescriptions[patient_ids[1]], start, 30, 3, 2)
+        journal.record(patient_ids[0], 999999, start, 30, 3, 2)
+
+        began = time.perf_counter()
+        totals = sync_journal(journal, Server, batch_size=1000)
+        elapsed = time.perf_counter() - began
+        print(f"synced {totals} in {elapsed * 1000:.0f} ms")
+        check(totals["accepted"] == QUEUED_SESSIONS, "every valid queued session is merged", failures)
+        check(totals["rejected"] == 2, "mismatched and unknown prescriptions are rejected", failures)
+        check(journal.counts()["pending"] == 0, "journal has nothing left pending", failures)
+
+        # A batch the server committed but the device never heard back about
+        for _ in range(REPLAYED_SESSIONS):
+            patient_id = rnd.choice(patient_ids)
+            journal.record(patient_id, prescriptions[patient_id], start + timedelta(days=rnd.randint(0, 120)), 30, 3, 1)
+        with Server() as db:
+            crud.merge_progress_batch(db, journal.pending())
+        totals = sync_journal(journal, Server)
+        check(totals["duplicates"] == REPLAYED_SESSIONS and totals["accepted"] == 0,
+              "resending an unacknowledged batch merges nothing twice", failures)
+        check(sync_journal(journal, Server)["batches"] == 0, "a second sync is a no-op", failures)
+
+        with Server() as db:
+            progress_rows = db.execute(
+                select(models.Progress.patient_id, models.Progress.prescription_id, models.Progress.date)
+            ).all()
+            expected_total = QUEUED_SESSIONS + REPLAYED_SESSIONS
+            check(len(progress_rows) == expected_total, f"server holds exactly {expected_total} sessions", failures)
+            check(db.scalar(select(func.count()).select_from(models.ProgressSync)) == expected_total,
+                  "every merged session has a client ID on the server", failures)
+
+            expected_weeks = Counter((row.prescription_id, week_start(row.date)) for row in progress_rows)
+            actual_weeks = {
+                (week.prescription_id, week.week_start): week.sessions
+                for week in db.scalars(select(models.AdherenceWeek))
+            }
+            check(actual_weeks == dict(expected_weeks), "weekly adherence counters match the merged sessions", failures)
+
+            expected_sessions = Counter(row.patient_id for row in progress_rows)
+            actual_sessions = {state.patient_id: state.sessions for state in db.scalars(select(models.PatientAlertState))}
+            check(actual_sessions == dict(expected_sessions), "alert state saw every merged session once", failures)
+
+        journal.dispose()
+        server_engine.dispose()
+
+    print("OK" if not failures else f"{len(failures)} check(s) failed")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
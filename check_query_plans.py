@@ -0,0 +1,279 @@
+"""Query plan regression check for the crud modules.
+
+Seeds both schemas at a reference size in memory, runs every crud query,
+and reads each statement's EXPLAIN QUERY PLAN and SQLite VM step count. Hot
+queries fail the check when they scan a whole table or exceed their step
+budget.
+
+    python check_query_plans.py
+"""
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, List, Optional, Tuple
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("EAM_SQL_ECHO", "0")
+
+# Reference data size the step budgets are calibrated against
+REFERENCE_PATIENTS = 2000
+SESSIONS_PER_PATIENT = 20
+PROBE_PATIENT_ID = REFERENCE_PATIENTS // 2
+
+# A bare "SCAN <table>" reads every row; "SCAN ... USING INDEX" and "SEARCH" do not.
+# SQLite before 3.36 prints "SCAN TABLE <table>".
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+@dataclass
+class QueryProbe:
+    """One crud call whose statements are checked"""
+    name: str
+    run: Callable[[Session], Any]
+    hot: bool = False
+    max_steps: Optional[int] = None  # VM instruction budget per statement at the reference size
+
+@dataclass
+class StatementPlan:
+    probe: str
+    statement: str
+    plan: List[str]
+    steps: Optional[int]
+    full_scans: List[str] = field(default_factory=list)
+
+def create_reference_engine(metadata):
+    """In-memory SQLite engine with the given schema"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    metadata.create_all(engine)
+    return engine
+
+def capture_statements(engine, fn: Callable[[], Any]) -> List[Tuple[str, tuple]]:
+    """Run fn and return every (statement, parameters) it sends to the database"""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            captured.append((statement, tuple(parameters or ())))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return captured
+
+def explain(engine, statement: str, parameters: tuple) -> List[str]:
+    """EXPLAIN QUERY PLAN detail lines for a statement"""
+    connection = engine.raw_connection()
+    try:
+        rows = connection.cursor().execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    finally:
+        connection.close()
+    return [row[3] for row in rows]
+
+def count_vm_steps(engine, statement: str, parameters: tuple) -> int:
+    """Run a read-only statement and count the SQLite VM instructions it takes"""
+    connection = engine.raw_connection()
+    steps = 0
+
+    def count():
+        nonlocal steps
+        steps += 1
+        return 0
+
+    sqlite_connection = connection.driver_connection
+    sqlite_connection.set_progress_handler(count, 1)
+    try:
+        connection.cursor().execute(statement, parameters).fetchall()
+    finally:
+        sqlite_connection.set_progress_handler(None, 1)
+        connection.close()
+    return steps
+
+def plan_probe(engine, Session: sessionmaker, probe: QueryProbe) -> List[StatementPlan]:
+    """Capture a probe's statements and plan each of them"""
+    db = Session()
+    try:
+        statements = capture_statements(engine, lambda: probe.run(db))
+    finally:
+        db.close()
+
+    plans = []
+    for statement, parameters in statements:
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if verb not in ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH"):
+            continue
+        plan = explain(engine, statement, parameters)
+        steps = count_vm_steps(engine, statement, parameters) if verb in ("SELECT", "WITH") else None
+        scans = [line for line in plan if _FULL_SCAN.match(line)]
+        plans.append(StatementPlan(probe.name, statement, plan, steps, scans))
+    return plans
+
+def seed_app_database(Session: sessionmaker) -> None:
+    """Seed the src.db schema at the reference size"""
+    from src.db import crud, models
+
+    db = Session()
+    start = datetime(2024, 1, 1)
+    patients = [
+        {"id": i, "name": f"Patient {i}", "age": 40 + i % 50,
+         "risk_factors": ["Diabetes"] if i % 3 == 0 else [], "goals": ["Weight Loss"] if i % 4 == 0 else []}
+        for i in range(1, REFERENCE_PATIENTS + 1)
+    ]
+    db.execute(models.Patient.__table__.insert(), patients)
+    db.execute(models.Prescription.__table__.insert(), [
+        {"id": i, "patient_id": i, "exercises": [], "frequency": "3 times per week", "duration": "30 minutes"}
+        for i in range(1, REFERENCE_PATIENTS + 1)
+    ])
+    db.execute(models.PrescriptionTemplate.__table__.insert(), [
+        {"id": 1, "name": "Reference", "exercises": [], "frequency": "3 times per week", "duration": "30 minutes"}
+    ])
+    db.execute(models.Progress.__table__.insert(), [
+        {"patient_id": i, "prescription_id": i, "date": start + timedelta(days=2 * d),
+         "duration": 30, "difficulty_level": 3, "pain_level": d % 4}
+        for i in range(1, REFERENCE_PATIENTS + 1)
+        for d in range(SESSIONS_PER_PATIENT)
+    ])
+    db.commit()
+    crud.backfill_adherence(db)
+    db.close()
+
+def seed_operations_database(Session: sessionmaker) -> None:
+    """Seed the src.database schema at the reference size"""
+    from src.database import models
+
+    db = Session()
+    db.execute(models.Condition.__table__.insert(), [
+        {"id": i, "name": f"condition_{i}"} for i in range(1, 51)
+    ])
+    db.execute(models.Exercise.__table__.insert(), [
+        {"id": i, "name": f"Exercise {i}", "condition_id": i % 50 + 1} for i in range(1, 1001)
+    ])
+    db.execute(models.Patient.__table__.insert(), [
+        {"id": i, "name": f"Patient {i}", "age": 60} for i in range(1, REFERENCE_PATIENTS + 1)
+    ])
+    start = datetime(2024, 1, 1)
+    db.execute(models.ProgressRecord.__table__.insert(), [
+        {"patient_id": i, "date": start + timedelta(days=d), "duration": 30}
+        for i in range(1, REFERENCE_PATIENTS + 1)
+        for d in range(SESSIONS_PER_PATIENT)
+    ])
+    db.commit()
+    db.close()
+
+def crud_probes() -> List[QueryProbe]:
+    """Every query issued by src/db/crud.py"""
+    from src.db import crud, segments
+
+    pid = PROBE_PATIENT_ID
+    segment = segments.Segment(risk_factors=["Diabetes"], goals=["Weight Loss"], min_age=60, max_age=80)
+    return [
+        QueryProbe("get_patient", lambda db: crud.get_patient(db, pid), hot=True, max_steps=200),
+        QueryProbe("get_prescription", lambda db: crud.get_prescription(db, pid), hot=True, max_steps=200),
+        QueryProbe("get_patient_prescriptions", lambda db: crud.get_patient_prescriptions(db, pid), hot=True, max_steps=500),
+        QueryProbe("get_patient_progress", lambda db: crud.get_patient_progress(db, pid), hot=True, max_steps=2000),
+        QueryProbe("get_patient_progress_window", lambda db: crud.get_patient_progress(
+            db, pid, date(2024, 1, 10), date(2024, 1, 20)), hot=True, max_steps=1000),
+        QueryProbe("get_patient_progress_recent", lambda db: crud.get_patient_progress(db, pid, limit=5), hot=True, max_steps=200),
+        QueryProbe("iter_patient_progress", lambda db: list(crud.iter_patient_progress(
+            db, pid, date(2024, 1, 1), None, chunk_size=8)), hot=True, max_steps=1000),
+        QueryProbe("get_progress_version", lambda db: crud.get_progress_version(db, pid), hot=True, max_steps=500),
+        QueryProbe("get_progress_version_window", lambda db: crud.get_progress_version(
+            db, pid, date(2024, 1, 10), date(2024, 1, 20)), hot=True, max_steps=500),
+        QueryProbe("list_open_alerts", crud.list_open_alerts, hot=True, max_steps=500),
+        QueryProbe("create_prescription", lambda db: crud.create_prescription(
+            db, pid, [], "3 times per week", "30 minutes", ""), hot=True, max_steps=500),
+        QueryProbe("record_progress", lambda db: crud.record_progress(
+            db, pid, pid, date(2024, 3, 1), 30, 3, 2, ""), hot=True, max_steps=500),
+        QueryProbe("merge_progress_batch", lambda db: crud.merge_progress_batch(db, [
+            {"client_id": f"probe-{n}", "patient_id": pid, "prescription_id": pid, "date": date(2024, 3, n + 1),
+             "duration": 30, "difficulty_level": 3, "pain_level": 2, "notes": ""}
+            for n in range(20)
+        ]), hot=True, max_steps=500),
+        QueryProbe("count_segment", lambda db: segments.count_segment(db, segment), hot=True, max_steps=30000),
+        QueryProbe("get_segment_patients", lambda db: segments.get_segment_patients(db, segment, limit=50),
+                   hot=True, max_steps=30000),
+        QueryProbe("list_all_patients", crud.list_all_patients),
+        QueryProbe("get_patient_roster", lambda db: crud.get_patient_roster(db, as_of=date(2024, 3, 1))),
+        QueryProbe("get_weekly_adherence", lambda db: crud.get_weekly_adherence(db, date(2024, 3, 1))),
+        QueryProbe("check_missed_sessions", lambda db: crud.check_missed_sessions(db, date(2024, 3, 1))),
+        QueryProbe("get_record_counts", crud.get_record_counts),
+        QueryProbe("get_cohort_totals", crud.get_cohort_totals),
+        QueryProbe("get_all_progress_rows", crud.get_all_progress_rows),
+        QueryProbe("backfill_adherence", crud.backfill_adherence),
+        QueryProbe("bulk_prescribe", lambda db: crud.bulk_prescribe(db, 1, segment)),
+    ]
+
+def operations_probes() -> List[QueryProbe]:
+    """Every read query issued by src/database/operations.py"""
+    from src.database import operations
+
+    pid = PROBE_PATIENT_ID
+    return [
+        QueryProbe("operations.get_patient", lambda db: operations.get_patient(db, pid), hot=True, max_steps=200),
+        QueryProbe("operations.get_patient_progress", lambda db: operations.get_patient_progress(db, pid), hot=True, max_steps=2000),
+        QueryProbe("operations.get_exercises_for_condition",
+                   lambda db: operations.get_exercises_for_condition(db, "condition_7"), hot=True, max_steps=2000),
+    ]
+
+def find_violations(plans: List[StatementPlan], probes: List[QueryProbe]) -> List[str]:
+    """Hot statements that scan a whole table or exceed their step budget"""
+    by_name = {probe.name: probe for probe in probes}
+    violations = []
+    for plan in plans:
+        probe = by_name[plan.probe]
+        if not probe.hot:
+            continue
+        for scan in plan.full_scans:
+            violations.append(f"{plan.probe}: full table {scan!r} in {plan.statement.split()[0]} statement")
+        if probe.max_steps is not None and plan.steps is not None and plan.steps > probe.max_steps:
+            violations.append(f"{plan.probe}: {plan.steps} VM steps exceeds budget of {probe.max_steps}")
+    return violations
+
+def run_query_plan_checks(verbose: bool = True) -> List[str]:
+    """Seed both schemas, plan every crud query and return the violations"""
+    from src.db.database import Base
+    from src.database.models import Base as OperationsBase
+
+    violations = []
+    suites = [
+        ("src/db/crud.py", Base.metadata, seed_app_database, crud_probes),
+        ("src/database/operations.py", OperationsBase.metadata, seed_operations_database, operations_probes),
+    ]
+    for label, metadata, seed, make_probes in suites:
+        engine = create_reference_engine(metadata)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        seed(Session)
+        probes = make_probes()
+
+        plans = []
+        for probe in probes:
+            plans.extend(plan_probe(engine, Session, probe))
+
+        if verbose:
+            print(f"\n=== {label} ===")
+            for plan in plans:
+                marker = "hot" if next(p for p in probes if p.name == plan.probe).hot else "   "
+                steps = f"{plan.steps} steps" if plan.steps is not None else "write"
+                print(f"[{marker}] {plan.probe} ({steps})")
+                for line in plan.plan:
+                    print(f"        {line}")
+        violations.extend(find_violations(plans, probes))
+        engine.dispose()
+    return violations
+
+def main() -> int:
+    violations = run_query_plan_checks()
+    print("\n=== Query plan check ===")
+    for violation in violations:
+        print(f"FAIL: {violation}")
+    print("OK" if not violations else f"{len(violations)} violation(s)")
+    return 1 if violations else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Check that recommendations respect the patient's age-appropriate difficulty.
+
+Scores every combination of the app library's conditions and the profile
+page's goals for a range of ages and fails if any exercise above a patient's
+allowed difficulty is ranked ahead of one within it.
+
+    python check_recommendations.py
+"""
+import os
+import sys
+from itertools import chain, combinations
+
+os.environ.setdefault("EAM_SQL_ECHO", "0")
+
+from src.app import CONDITION_KEYS, get_exercises_for_condition
+from src.recommendations import (
+    GOAL_KEYWORDS, build_catalog, max_difficulty_for_age, recommend_exercises, recommend_exercises_bulk
+)
+
+AGES = [40, 64, 65, 79, 80, 85, 95]
+
+def subsets(items: list) -> list:
+    return [list(combo) for combo in chain.from_iterable(combinations(items, n) for n in range(len(items) + 1))]
+
+def main() -> int:
+    catalog = build_catalog({condition: get_exercises_for_condition(condition) for condition in CONDITION_KEYS})
+    rank = {exercise.name: int(level) for exercise, level in zip(catalog.exercises, catalog.difficulty)}
+
+    patients = [
+        (conditions, goals, age)
+        for conditions in subsets(catalog.conditions) if conditions
+        for goals in subsets(catalog.goals)
+        for age in AGES
+    ]
+    results = recommend_exercises_bulk(
+        catalog,
+        [conditions for conditions, _, _ in patients],
+        [goals for _, goals, _ in patients],
+        [age for _, _, age in patients],
+        top_k=len(catalog.exercises)
+    )
+
+    failures = 0
+    for (conditions, goals, age), exercises in zip(patients, results):
+        limit = int(max_difficulty_for_age([age])[0])
+        over = [rank[exercise.name] > limit for exercise in exercises]
+        # Once an exercise above the limit appears, nothing within it may follow
+        if over != sorted(over):
+            failures += 1
+            print(f"FAIL age {age}, {conditions}, {goals}: {[exercise.name for exercise in exercises]}")
+
+    top = recommend_exercises(catalog, ["fall_prevention", "weight_management"], ["Weight Loss"], 85, top_k=1)
+    print(f"85-year-old, fall prevention + weight management, Weight Loss: {top[0].name}")
+    if rank[top[0].name] > int(max_difficulty_for_age([85])[0]):
+        failures += 1
+        print("FAIL: top pick is above the allowed difficulty")
+
+    print(f"{len(patients)} patient profiles checked across goals {list(GOAL_KEYWORDS)}")
+    print("OK" if not failures else f"{failures} check(s) failed")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import re
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Sequence, Tuple, Union
+
+DEFAULT_SESSIONS_PER_WEEK = 3
+DEFAULT_MINUTES_PER_SESSION = 30
+AT_RISK_THRESHOLD = 0.6
+
+_NUMBER = r"\d+(?:\.\d+)?"
+# "1-2", "2 to 3", "3 or 4": ranges target their upper end, the prescribed goal
+_COUNT = re.compile(rf"({_NUMBER})(?:\s*(?:-|–|to|or)\s*({_NUMBER}))?")
+_HOURS = re.compile(rf"({_NUMBER})(?:\s*(?:-|–|to|or)\s*({_NUMBER}))?\s*(?:hours?|hrs?|h)\b")
+_MINUTES = re.compile(rf"({_NUMBER})(?:\s*(?:-|–|to|or)\s*({_NUMBER}))?\s*(?:minutes?|mins?|m)\b")
+_PER_DAY = re.compile(r"\b(?:per|a|each|every|/)\s*day\b|\bdaily\b")
+
+_WORD_NUMBERS = {
+    "once": "1", "twice": "2", "thrice": "3", "one": "1", "two": "2", "three": "3", "four": "4",
+    "five": "5", "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+}
+_WORD_NUMBER = re.compile(rf"\b({'|'.join(_WORD_NUMBERS)})\b")
+
+def _normalize(text: str) -> str:
+    text = text.lower()
+    text = re.sub(r"\bhalf an? hour\b", "0.5 hour", text)
+    text = re.sub(r"\ban? hour and a half\b", "1.5 hours", text)
+    text = re.sub(r"\ban? hour\b", "1 hour", text)
+    return _WORD_NUMBER.sub(lambda match: _WORD_NUMBERS[match.group(1)], text)
+
+def _upper(match) -> float:
+    return float(match.group(2) or match.group(1))
+
+def parse_frequency(frequency: Optional[str]) -> Optional[int]:
+    """Parse a frequency like '3 times per week' or 'twice daily' into sessions per week (None if not understood)"""
+    if not frequency:
+        return None
+    text = _normalize(frequency)
+    per_day = _PER_DAY.search(text) and "week" not in text
+    match = _COUNT.search(text)
+    if not match:
+        # "daily" / "every day" / "weekly" on their own
+        if per_day:
+            return 7
+        return 1 if "weekly" in text else None
+    sessions = round(_upper(match))
+    if per_day:
+        sessions *= 7
+    return sessions if sessions >= 1 else None
+
+def parse_duration(duration: Optional[str]) -> Optional[int]:
+    """Parse a duration like '30 minutes' or '1.5 hours' into minutes per session (None if not understood)"""
+    if not duration:
+        return None
+    text = _normalize(duration)
+    hours = sum(_upper(match) for match in _HOURS.finditer(text))
+    minutes = sum(_upper(match) for match in _MINUTES.finditer(text))
+    if not hours and not minutes:
+        # A bare number is minutes
+        match = _COUNT.search(text)
+        minutes = _upper(match) if match else 0
+    total = round(hours * 60 + minutes)
+    return total if total >= 1 else None
+
+def parse_targets(frequency: Optional[str], duration: Optional[str]) -> Tuple[int, int, bool]:
+    """Sessions per week and minutes per session, and whether either fell back to the default"""
+    sessions = parse_frequency(frequency)
+    minutes = parse_duration(duration)
+    defaulted = sessions is None or minutes is None
+    return sessions or DEFAULT_SESSIONS_PER_WEEK, minutes or DEFAULT_MINUTES_PER_SESSION, defaulted
+
+def week_start(day: Union[date, datetime]) -> date:
+    """Monday of the week containing the given day"""
+    if isinstance(day, datetime):
+        day = day.date()
+    return day - timedelta(days=day.weekday())
+
+def compute_adherence(rows: Sequence, as_of: date, weeks: int) -> List[dict]:
+    """Compute adherence ratios for grouped adherence rows in one NumPy pass.
+
+    Each row carries the prescription targets and the session/minute totals
+    recorded within the window, as returned by crud.get_adherence_totals.
+    Only the completed weeks before as_of count towards the ratios, and a
+    prescription's first week is pro-rated from its start day; the week in
+    progress is reported separately as current_week_adherence. A prescription
+    with no completed day yet has no ratio (None).
+    """
+    if not rows:
+        return []
+    
+    # Deferred so pages that never compute adherence don't pay for numpy at startup
+    import numpy as np
+
+    current_week = week_start(as_of)
+    window_start = current_week - timedelta(weeks=weeks)
+    completed_weeks = np.array(
+        [max((current_week - max(row.start_date or as_of, window_start)).days, 0) for row in rows]
+    ) / 7
+
+    sessions_per_week = np.array([row.sessions_per_week for row in rows], dtype=float)
+    minutes_per_session = np.array([row.minutes_per_session for row in rows], dtype=float)
+    sessions = np.array([row.sessions or 0 for row in rows], dtype=float)
+    minutes = np.array([row.minutes or 0 for row in rows], dtype=float)
+    this_week = np.array([row.this_week or 0 for row in rows], dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        session_ratio = sessions / (sessions_per_week * completed_weeks)
+        minute_ratio = minutes / (sessions_per_week * minutes_per_session * completed_weeks)
+    week_ratio = this_week / sessions_per_week
+
+    return [
+        {
+            "patient_id": row.patient_id,
+            "patient": row.name,
+            "prescription_id": row.prescription_id,
+            "target_per_week": int(row.sessions_per_week),
+            "target_defaulted": bool(row.defaulted),
+            "sessions_this_week": int(this_week[i]),
+            "weekly_adherence": round(float(session_ratio[i]), 2) if completed_weeks[i] else None,
+            "minutes_adherence": round(float(minute_ratio[i]), 2) if completed_weeks[i] else None,
+            "current_week_adherence": round(float(week_ratio[i]), 2),
+            "last_active_week": row.last_active_week,
+        }
+        for i, row in enumerate(rows)
+    ]
+
+def at_risk(adherence: List[dict], threshold: float = AT_RISK_THRESHOLD) -> List[dict]:
+    """Prescriptions whose weekly adherence is below the threshold, worst first"""
+    flagged = [
+        row for row in adherence
+        if row["weekly_adherence"] is not None and row["weekly_adherence"] < threshold
+    ]
+    return sorted(flagged, key=lambda row: row["weekly_adherence"])
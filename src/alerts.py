@@ -0,0 +1,81 @@
+from datetime import date, datetime, time
+from typing import List, Optional, Tuple, Union
+
+# Alert kinds
+PAIN_SPIKE = "pain_spike"
+DURATION_DECLINE = "duration_decline"
+MISSED_SESSIONS = "missed_sessions"
+
+# Smoothing factor for the pain and duration EWMAs
+EWMA_ALPHA = 0.3
+
+# One-sided CUSUM on pain above its EWMA: slack per session and decision threshold
+PAIN_CUSUM_SLACK = 1.0
+PAIN_CUSUM_THRESHOLD = 4.0
+
+# A single session this far above the pain EWMA is a spike on its own
+PAIN_JUMP_THRESHOLD = 3.0
+
+# Alert when durations shrink on average by this many minutes per session
+DURATION_DECLINE_THRESHOLD = -3.0
+
+# Sessions needed before the baselines are trusted
+WARMUP_SESSIONS = 3
+
+# Missed sessions: alert after this many expected sessions pass without one
+MISSED_SESSIONS_ALLOWED = 2
+
+def _as_datetime(day: Union[date, datetime]) -> datetime:
+    if isinstance(day, datetime):
+        return day
+    return datetime.combine(day, time())
+
+def _ewma(previous: Optional[float], value: float) -> float:
+    if previous is None:
+        return float(value)
+    return EWMA_ALPHA * value + (1 - EWMA_ALPHA) * previous
+
+def update_state(
+    state,
+    day: Union[date, datetime],
+    pain_level: Optional[int],
+    duration: Optional[int]
+) -> List[Tuple[str, str, float]]:
+    """Fold one session into a patient's alert state in O(1).
+
+    Returns the (kind, message, value) alerts the session raises.
+    """
+    alerts = []
+    warmed_up = state.sessions >= WARMUP_SESSIONS
+
+    if pain_level is not None:
+        baseline = state.pain_ewma
+        if baseline is not None:
+            state.pain_cusum = max(0.0, state.pain_cusum + pain_level - baseline - PAIN_CUSUM_SLACK)
+            jump = pain_level - baseline
+            if warmed_up and (jump >= PAIN_JUMP_THRESHOLD or state.pain_cusum > PAIN_CUSUM_THRESHOLD):
+                alerts.append((
+                    PAIN_SPIKE,
+                    f"Pain {pain_level}/10 against a recent average of {baseline:.1f}",
+                    float(pain_level)
+                ))
+                state.pain_cusum = 0.0
+        state.pain_ewma = _ewma(baseline, pain_level)
+
+    if duration is not None:
+        if state.last_duration is not None:
+            state.duration_trend = _ewma(state.duration_trend, duration - state.last_duration)
+            if warmed_up and state.duration_trend <= DURATION_DECLINE_THRESHOLD:
+                alerts.append((
+                    DURATION_DECLINE,
+                    f"Session length falling by {-state.duration_trend:.1f} min per session",
+                    float(state.duration_trend)
+                ))
+        state.duration_ewma = _ewma(state.duration_ewma, duration)
+        state.last_duration = duration
+
+    day = _as_datetime(day)
+    if state.last_session_date is None or day > state.last_session_date:
+        state.last_session_date = day
+    state.sessions += 1
+    return alerts
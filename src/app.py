@@ -1,10 +1,17 @@
 import streamlit as st
-from datetime import datetime
+from datetime import datetime, timedelta
 from dataclasses import dataclass
 from typing import List
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from src.db.database import SessionLocal
+from src.db.database import ScopedSession, init_db, rerun_session
 from src.db import crud, models
+from src.db.shards import DEFAULT_CLINIC, cross_clinic_counts, registry
+from src.db.changes import ChangeSubscriber
+from src.db.segments import Segment, count_segment
+from src.adherence import AT_RISK_THRESHOLD, DEFAULT_MINUTES_PER_SESSION, DEFAULT_SESSIONS_PER_WEEK, at_risk
+from src.profiling import counted, profiled
+from src.progress_cache import get_progress_frame, record_in_frame
 
 @dataclass
 class Exercise:
@@ -76,17 +83,50 @@ def get_exercises_for_condition(condition: str) -> List[Exercise]:
     
     return exercise_library.get(condition, [])
 
+CONDITION_KEYS = ["fall_prevention", "pain_management", "diabetes_management", "weight_management"]
+
+@st.cache_resource
+def get_exercise_catalog():
+    """Build the exercise catalog once per server process"""
+    from src.recommendations import build_catalog
+    return build_catalog({cond: get_exercises_for_condition(cond) for cond in CONDITION_KEYS})
+
 def get_db_session():
-    """Get database session"""
-    db = SessionLocal()
+    """Get the database session scoped to the current rerun"""
     try:
-        return db
+        return ScopedSession()
     except Exception as e:
         st.error(f"Database connection error: {str(e)}")
         raise
 
+def current_clinic() -> str:
+    return st.session_state.get('clinic_id', DEFAULT_CLINIC)
+
+def clinic_session():
+    """Session on the selected clinic's shard.
+
+    Fragments rerun without main, so each opens its own; during a full rerun
+    this is the rerun's session.
+    """
+    return rerun_session(bind=registry.engine(current_clinic()))
+
+PAGES = ["Patient Profile", "Exercise Prescription", "Progress Tracking", "Bulk Prescribing", "Monitoring"]
+
+RISK_FACTORS = ["High Blood Pressure", "Diabetes", "Heart Disease", "Osteoporosis"]
+GOALS = ["Improve Balance", "Reduce Pain", "Increase Strength", "Weight Loss"]
+FREQUENCIES = ["2 times per week", "3 times per week", "4 times per week", "5 times per week"]
+SESSION_DURATIONS = ["15 minutes", "20 minutes", "30 minutes", "45 minutes"]
+
+@st.cache_resource
+def init_database() -> None:
+    """Create tables once per server process instead of on import"""
+    init_db()
+
+@profiled
+@counted
 def main():
     st.title("Exercise as Medicine MVP")
+    init_database()
     
     # Sidebar for navigation
     if 'page' not in st.session_state:
@@ -94,89 +134,95 @@ def main():
     
     page = st.sidebar.selectbox(
         "Select Page",
-        ["Patient Profile", "Exercise Prescription", "Progress Tracking"],
-        index=["Patient Profile", "Exercise Prescription", "Progress Tracking"].index(st.session_state['page'])
+        PAGES,
+        index=PAGES.index(st.session_state['page'])
     )
     
     # Update session state when page changes
     st.session_state['page'] = page
     
-    if page == "Patient Profile":
-        show_patient_profile()
-    elif page == "Exercise Prescription":
-        show_exercise_prescription()
-    else:
-        show_progress_tracking()
+    clinic_id = select_clinic()
+    
+    # One session per rerun on the clinic's shard, released deterministically when the page is done
+    with rerun_session(bind=registry.engine(clinic_id)):
+        if page == "Patient Profile":
+            show_patient_profile()
+        elif page == "Exercise Prescription":
+            show_exercise_prescription()
+        elif page == "Progress Tracking":
+            show_progress_tracking()
+        elif page == "Bulk Prescribing":
+            show_bulk_prescribing()
+        else:
+            show_monitoring()
+
+CLINIC_COUNTS_TTL_SECONDS = 60
+
+@st.cache_data(ttl=CLINIC_COUNTS_TTL_SECONDS, show_spinner=False)
+def get_cross_clinic_counts(clinics: tuple, versions: tuple) -> dict:
+    """Fan out to every shard only when one of them changed or the TTL lapsed"""
+    return cross_clinic_counts(clinics)
 
+def select_clinic() -> str:
+    """Pick the clinic shard for this browser session"""
+    clinics = registry.clinic_ids()
+    if 'clinic_id' not in st.session_state:
+        st.session_state['clinic_id'] = DEFAULT_CLINIC
+    if len(clinics) == 1:
+        return st.session_state['clinic_id']
+    
+    clinic_id = st.sidebar.selectbox(
+        "Clinic",
+        clinics,
+        index=clinics.index(st.session_state['clinic_id']) if st.session_state['clinic_id'] in clinics else 0
+    )
+    if clinic_id != st.session_state['clinic_id']:
+        # Patient and prescription IDs are only meaningful within one shard
+        for key in ['current_patient_id', 'current_prescription_id', 'prescription_generated', 'progress_frames',
+                    'roster_pages']:
+            st.session_state.pop(key, None)
+        st.session_state['clinic_id'] = clinic_id
+    
+    with st.sidebar.expander("All clinics"):
+        counts = get_cross_clinic_counts(
+            tuple(clinics), tuple(registry.shard_version(clinic) for clinic in clinics)
+        )
+        st.dataframe(
+            [{"clinic": clinic, **clinic_counts} for clinic, clinic_counts in counts["clinics"].items()],
+            hide_index=True
+        )
+        st.caption(f"Total: {counts['total']['patients']} patients, {counts['total']['sessions']} sessions")
+    return clinic_id
+
+@profiled
 def show_patient_profile():
     """Show patient profile page"""
     st.header("Patient Profile")
     
     # Show existing patients first
-    try:
-        db = get_db_session()
-        patients = crud.list_all_patients(db)
-        if patients:
-            st.subheader("Existing Patients")
-            
-            # Create columns for layout
-            col1, col2 = st.columns([2, 1])
-            
-            with col1:
-                # Create a selection box for patients
-                patient_options = {f"{p.name} (ID: {p.id})": p.id for p in patients}
-                selected_patient = st.selectbox(
-                    "Select a patient to view or edit",
-                    options=list(patient_options.keys()),
-                    key="patient_selector"
-                )
-            
-            with col2:
-                # Add button to create prescription
-                if st.button("Create Prescription", key="create_prescription"):
-                    selected_patient_id = patient_options[selected_patient]
-                    st.session_state['current_patient_id'] = selected_patient_id
-                    st.session_state['page'] = "Exercise Prescription"
-                    st.rerun()
-            
-            if selected_patient:
-                # Display patient details
-                selected_patient_id = patient_options[selected_patient]
-                patient = next(p for p in patients if p.id == selected_patient_id)
-                with st.expander("Patient Details", expanded=True):
-                    st.write(f"Name: {patient.name}")
-                    st.write(f"Age: {patient.age}")
-                    st.write(f"Risk Factors: {', '.join(patient.risk_factors) if patient.risk_factors else 'None'}")
-                    st.write(f"Goals: {', '.join(patient.goals) if patient.goals else 'None'}")
-        else:
-            st.info("No patients in database")
-    except Exception as e:
-        st.error(f"Error fetching patients: {str(e)}")
-        st.exception(e)  # This will show the full error trace
-    finally:
-        if 'db' in locals():
-            db.close()
+    show_patient_selector()
     
-    # Form for adding new patient
-    st.subheader("Add New Patient")
+    show_patient_roster()
     
-    # Basic patient information form
-    name = st.text_input("Patient Name")
-    age = st.number_input("Age", min_value=0, max_value=120)
+    show_adherence_at_risk()
     
-    # Risk factors
-    risk_factors = st.multiselect(
-        "Select Risk Factors",
-        ["High Blood Pressure", "Diabetes", "Heart Disease", "Osteoporosis"]
-    )
+    # Form for adding new patient
+    st.subheader("Add New Patient")
     
-    # Goals
-    goals = st.multiselect(
-        "Select Goals",
-        ["Improve Balance", "Reduce Pain", "Increase Strength", "Weight Loss"]
-    )
+    # Typing and picking options stay client-side until the form is submitted
+    with st.form("new_patient"):
+        name = st.text_input("Patient Name")
+        age = st.number_input("Age", min_value=0, max_value=120)
+        
+        # Risk factors
+        risk_factors = st.multiselect("Select Risk Factors", RISK_FACTORS)
+        
+        # Goals
+        goals = st.multiselect("Select Goals", GOALS)
+        
+        submitted = st.form_submit_button("Save Profile")
     
-    if st.button("Save Profile"):
+    if submitted:
         if name and age:
             try:
                 db = get_db_session()
@@ -192,11 +238,151 @@ def show_patient_profile():
             except Exception as e:
                 st.error(f"Error saving patient profile: {str(e)}")
                 st.exception(e)
-            finally:
-                db.close()
         else:
             st.error("Please fill in all required fields")
 
+@st.fragment
+@counted
+def show_patient_selector():
+    """Existing patients; choosing one reruns only this fragment"""
+    try:
+        with clinic_session() as db:
+            patients = crud.list_all_patients(db)
+            if patients:
+                st.subheader("Existing Patients")
+                
+                # Create columns for layout
+                col1, col2 = st.columns([2, 1])
+                
+                with col1:
+                    # Create a selection box for patients
+                    patient_options = {f"{p.name} (ID: {p.id})": p.id for p in patients}
+                    selected_patient = st.selectbox(
+                        "Select a patient to view or edit",
+                        options=list(patient_options.keys()),
+                        key="patient_selector"
+                    )
+                
+                with col2:
+                    # Add button to create prescription
+                    if st.button("Create Prescription", key="create_prescription"):
+                        selected_patient_id = patient_options[selected_patient]
+                        st.session_state['current_patient_id'] = selected_patient_id
+                        st.session_state['page'] = "Exercise Prescription"
+                        st.rerun()
+                
+                if selected_patient:
+                    # Display patient details
+                    selected_patient_id = patient_options[selected_patient]
+                    patient = next(p for p in patients if p.id == selected_patient_id)
+                    with st.expander("Patient Details", expanded=True):
+                        st.write(f"Name: {patient.name}")
+                        st.write(f"Age: {patient.age}")
+                        st.write(f"Risk Factors: {', '.join(patient.risk_factors) if patient.risk_factors else 'None'}")
+                        st.write(f"Goals: {', '.join(patient.goals) if patient.goals else 'None'}")
+            else:
+                st.info("No patients in database")
+    except Exception as e:
+        st.error(f"Error fetching patients: {str(e)}")
+        st.exception(e)  # This will show the full error trace
+
+ROSTER_COLUMNS = {
+    "name": st.column_config.TextColumn("Name"),
+    "age": st.column_config.NumberColumn("Age"),
+    "last_session": st.column_config.DatetimeColumn("Last session", format="YYYY-MM-DD"),
+    "sessions_30d": st.column_config.NumberColumn("Sessions (30 days)"),
+    "latest_pain": st.column_config.NumberColumn("Latest pain"),
+    "active_prescriptions": st.column_config.NumberColumn("Active prescriptions"),
+}
+
+def _roster_page(step: int, cursor=None) -> None:
+    cursors = st.session_state['roster_pages']['cursors']
+    if step > 0:
+        cursors.append(cursor)
+    elif len(cursors) > 1:
+        cursors.pop()
+
+@st.fragment
+@counted
+def show_patient_roster():
+    """Sortable roster with activity columns; sorting and paging rerun only this fragment"""
+    st.subheader("Patient Roster")
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        sort = st.selectbox(
+            "Sort by", crud.ROSTER_SORTS,
+            format_func=lambda column: ROSTER_COLUMNS[column].get("label", column), key="roster_sort"
+        )
+    with col2:
+        descending = st.toggle("Descending", value=True, key="roster_descending")
+    
+    # Keyset cursors of the pages visited so far; a new ordering starts over at page one
+    pages = st.session_state.get('roster_pages')
+    if pages is None or pages['order'] != (sort, descending):
+        pages = st.session_state['roster_pages'] = {'order': (sort, descending), 'cursors': [None]}
+    
+    try:
+        with clinic_session() as db:
+            # One extra row tells whether there is a next page
+            rows = crud.get_patient_roster(
+                db, sort, descending, after=pages['cursors'][-1], limit=crud.ROSTER_PAGE_SIZE + 1
+            )
+    except Exception as e:
+        st.error(f"Error loading roster: {str(e)}")
+        st.exception(e)
+        return
+    
+    has_next = len(rows) > crud.ROSTER_PAGE_SIZE
+    rows = rows[:crud.ROSTER_PAGE_SIZE]
+    if not rows:
+        st.info("No patients in database")
+        return
+    
+    st.dataframe(rows, column_config={"id": "ID", **ROSTER_COLUMNS}, hide_index=True, use_container_width=True)
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("Previous", key="roster_previous", disabled=len(pages['cursors']) == 1,
+                  on_click=_roster_page, args=(-1,))
+    with col2:
+        st.caption(f"Page {len(pages['cursors'])}")
+    with col3:
+        st.button("Next", key="roster_next", disabled=not has_next,
+                  on_click=_roster_page, args=(1, (rows[-1][sort], rows[-1]['id'])))
+
+@st.cache_resource
+def backfill_adherence_once(clinic_id: str) -> int:
+    """Backfill adherence targets for older prescriptions once per clinic and server process"""
+    with registry.session(clinic_id) as db:
+        return crud.backfill_adherence(db)
+
+@st.fragment
+@counted
+def show_adherence_at_risk():
+    """Show active prescriptions that are falling behind their weekly target"""
+    st.subheader("Patients At Risk")
+    
+    try:
+        backfill_adherence_once(current_clinic())
+        weeks = st.select_slider("Adherence window (completed weeks)", options=[1, 2, 4, 8], value=4)
+        with clinic_session() as db:
+            flagged = at_risk(crud.get_weekly_adherence(db, weeks=weeks))
+        if flagged:
+            st.caption(f"Active prescriptions below {AT_RISK_THRESHOLD:.0%} of their weekly session target")
+            st.dataframe(flagged, use_container_width=True, hide_index=True)
+            defaulted = sum(row["target_defaulted"] for row in flagged)
+            if defaulted:
+                st.caption(f"{defaulted} of these use the default target of {DEFAULT_SESSIONS_PER_WEEK} sessions "
+                           f"of {DEFAULT_MINUTES_PER_SESSION} minutes because the prescription's frequency or "
+                           f"duration could not be read")
+        else:
+            st.info("No patients are falling behind their prescriptions")
+    except Exception as e:
+        st.error(f"Error computing adherence: {str(e)}")
+        st.exception(e)
+
+@profiled
 def show_exercise_prescription():
     st.header("Exercise Prescription")
     
@@ -204,65 +390,80 @@ def show_exercise_prescription():
         st.warning("Please create a patient profile first")
         return
     
+    show_prescription_builder(st.session_state['current_patient_id'])
+    
+    # Show success message and navigation button after prescription is generated
+    if 'prescription_generated' in st.session_state:
+        st.success("Prescription generated and saved successfully!")
+        if st.button("Go to Progress Tracking"):
+            st.session_state['page'] = "Progress Tracking"
+            st.rerun()
+
+@st.fragment
+@counted
+def show_prescription_builder(patient_id: int):
+    """Condition picks rerun only the recommendations; the details form submits once"""
     try:
-        db = get_db_session()
-        patient = crud.get_patient(db, st.session_state['current_patient_id'])
-        
-        if not patient:
-            st.error("Patient not found in database")
-            return
-        
-        st.write(f"Creating prescription for: {patient.name}")
-        
-        # Exercise recommendations
-        available_conditions = [
-            "Fall Prevention",
-            "Pain Management",
-            "Diabetes Management",
-            "Weight Management"
-        ]
-        
-        selected_conditions = st.multiselect(
-            "Select conditions to address",
-            available_conditions
-        )
-        
-        if selected_conditions:
-            for condition in selected_conditions:
-                st.subheader(f"Recommended exercises for {condition}")
-                exercises = get_exercises_for_condition(condition.lower().replace(" ", "_"))
-                
-                if exercises:
-                    for exercise in exercises:
+        with clinic_session() as db:
+            patient = crud.get_patient(db, patient_id)
+            
+            if not patient:
+                st.error("Patient not found in database")
+                return
+            
+            st.write(f"Creating prescription for: {patient.name}")
+            
+            # Exercise recommendations
+            available_conditions = [
+                "Fall Prevention",
+                "Pain Management",
+                "Diabetes Management",
+                "Weight Management"
+            ]
+            
+            selected_conditions = st.multiselect(
+                "Select conditions to address",
+                available_conditions
+            )
+            top_k = st.number_input("Number of exercises", min_value=1, max_value=10, value=4)
+            
+            recommended = []
+            if selected_conditions:
+                from src.recommendations import recommend_exercises
+                recommended = recommend_exercises(
+                    get_exercise_catalog(),
+                    conditions=[cond.lower().replace(" ", "_") for cond in selected_conditions],
+                    goals=patient.goals or [],
+                    age=patient.age,
+                    top_k=top_k
+                )
+                st.subheader(f"Recommended exercises for {', '.join(selected_conditions)}")
+                if recommended:
+                    for exercise in recommended:
                         st.write(f"**{exercise.name}**")
                         st.write(exercise.description)
                         st.write(f"Difficulty: {exercise.difficulty_level}")
                         st.write(f"Target Areas: {', '.join(exercise.target_areas)}")
                         st.write("---")
                 else:
-                    st.info(f"No exercises found for {condition}")
-        
-        # Prescription details
-        frequency = st.selectbox(
-            "Exercise Frequency",
-            ["2 times per week", "3 times per week", "4 times per week", "5 times per week"]
-        )
-        
-        duration = st.selectbox(
-            "Session Duration",
-            ["15 minutes", "20 minutes", "30 minutes", "45 minutes"]
-        )
-        
-        notes = st.text_area("Additional Notes")
-        
-        col1, col2 = st.columns([1, 2])
-        with col1:
-            if st.button("Generate Prescription"):
+                    st.info("No exercises found for the selected conditions")
+            
+            # Prescription details
+            with st.form("prescription_details"):
+                frequency = st.selectbox("Exercise Frequency", FREQUENCIES)
+                
+                duration = st.selectbox("Session Duration", SESSION_DURATIONS)
+                
+                notes = st.text_area("Additional Notes")
+                
+                submitted = st.form_submit_button("Generate Prescription")
+            
+            if submitted:
                 try:
                     prescription = crud.create_prescription(
                         db=db,
                         patient_id=patient.id,
-                        exercises=[{"name": ex.name, "description": ex.description} for cond in selected_conditions for ex in get_exercises_for_condition(cond.lower().replace(" ", "_"))],
+                        exercises=[{"name": ex.name, "description": ex.description} for ex in recommended],
                         frequency=frequency,
                         duration=duration,
                         notes=notes
@@ -273,22 +474,104 @@ def show_exercise_prescription():
                 except Exception as e:
                     st.error(f"Error saving prescription: {str(e)}")
                     st.exception(e)
-
-        # Show success message and navigation button after prescription is generated
-        if 'prescription_generated' in st.session_state:
-            st.success("Prescription generated and saved successfully!")
-            if st.button("Go to Progress Tracking"):
-                st.session_state['page'] = "Progress Tracking"
-                st.rerun()
     except Exception as e:
         st.error(f"Database error: {str(e)}")
         st.exception(e)
-    finally:
-        if 'db' in locals():
-            db.close()
 
-from src.visualizations import display_progress_visualizations
+@profiled
+def show_bulk_prescribing():
+    """Save prescription templates and prescribe one to a whole patient segment"""
+    st.header("Bulk Prescribing")
+    
+    st.subheader("New Template")
+    with st.form("new_template"):
+        name = st.text_input("Template Name")
+        exercise_names = st.multiselect("Exercises", [ex.name for ex in get_exercise_catalog().exercises])
+        frequency = st.selectbox("Exercise Frequency", FREQUENCIES)
+        duration = st.selectbox("Session Duration", SESSION_DURATIONS)
+        notes = st.text_area("Additional Notes")
+        submitted = st.form_submit_button("Save Template")
+    
+    if submitted:
+        if name and exercise_names:
+            try:
+                catalog = {ex.name: ex for ex in get_exercise_catalog().exercises}
+                template = crud.create_prescription_template(
+                    db=get_db_session(),
+                    name=name,
+                    exercises=[{"name": ex, "description": catalog[ex].description} for ex in exercise_names],
+                    frequency=frequency,
+                    duration=duration,
+                    notes=notes
+                )
+                st.success(f"Template '{template.name}' saved")
+            except IntegrityError:
+                get_db_session().rollback()
+                st.error(f"A template named '{name}' already exists")
+            except Exception as e:
+                get_db_session().rollback()
+                st.error(f"Error saving template: {str(e)}")
+        else:
+            st.error("Please name the template and pick at least one exercise")
+    
+    # Rendered after the form so a template saved this run is already listed
+    show_bulk_prescriber()
+
+@st.fragment
+@counted
+def show_bulk_prescriber():
+    """Segment filters rerun only this fragment, so the dry-run count stays live"""
+    st.subheader("Prescribe to a Segment")
+    
+    try:
+        with clinic_session() as db:
+            templates = {template.id: template for template in crud.list_prescription_templates(db)}
+            if not templates:
+                st.info("Save a template above to prescribe it in bulk")
+                return
+            
+            template_id = st.selectbox(
+                "Template", list(templates), format_func=lambda template_id: templates[template_id].name,
+                key="bulk_template"
+            )
+            template = templates[template_id]
+            st.caption(f"{', '.join(ex['name'] for ex in template.exercises or [])} · "
+                       f"{template.frequency} · {template.duration}")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                risk_factors = st.multiselect("Risk factors", RISK_FACTORS, key="bulk_risk_factors")
+            with col2:
+                goals = st.multiselect("Goals", GOALS, key="bulk_goals")
+            min_age, max_age = st.slider("Age", 0, 120, (0, 120), key="bulk_age")
+            segment = Segment(
+                risk_factors=risk_factors,
+                goals=goals,
+                min_age=min_age if min_age > 0 else None,
+                max_age=max_age if max_age < 120 else None
+            )
+            
+            # Dry run: how many patients the segment covers right now
+            matched = count_segment(db, segment)
+            st.metric("Matching patients", matched)
+            st.caption(f"Segment: {segment.describe()}")
+            
+            if st.button(f"Prescribe to {matched} patients", key="bulk_prescribe", disabled=matched == 0):
+                progress = st.progress(0.0, text="Prescribing...")
+                prescribed = crud.bulk_prescribe(
+                    db, template_id, segment,
+                    on_progress=lambda done, total: progress.progress(done / total, text=f"Prescribed {done} of {total}")
+                )
+                st.success(f"Prescribed '{template.name}' to {prescribed} patients")
+    except Exception as e:
+        st.error(f"Error prescribing: {str(e)}")
+        st.exception(e)
+
+# History shown by default, and the size of the recent-entries list
+PROGRESS_WINDOW_DAYS = 90
+RECENT_ENTRIES = 5
 
+@profiled
 def show_progress_tracking():
     st.header("Progress Tracking")
     
@@ -315,40 +598,86 @@ def show_progress_tracking():
         tab1, tab2 = st.tabs(["Record Progress", "View Progress"])
         
         with tab1:
-            # Progress tracking form
-            date = st.date_input("Date")
-            duration = st.number_input("Exercise Duration (minutes)", min_value=0)
-            difficulty = st.slider("Difficulty Level (1-5)", 1, 5)
-            pain = st.slider("Pain Level (0-10)", 0, 10)
-            notes = st.text_area("Session Notes")
-            
-            if st.button("Record Progress"):
-                try:
-                    progress = crud.record_progress(
-                        db=db,
-                        patient_id=patient.id,
-                        prescription_id=prescription.id,
-                        date=date,
-                        duration=duration,
-                        difficulty_level=difficulty,
-                        pain_level=pain,
-                        notes=notes
-                    )
-                    st.success("Progress recorded successfully!")
-                except Exception as e:
-                    st.error(f"Error recording progress: {str(e)}")
-                    st.exception(e)
+            show_progress_entry(patient.id, prescription.id)
         
         with tab2:
-            # Get all progress entries for visualization
-            progress_history = crud.get_patient_progress(db, patient.id)
-            display_progress_visualizations(progress_history)
+            show_progress_charts(patient.id)
+            
+    except Exception as e:
+        st.error(f"Database error: {str(e)}")
+        st.exception(e)
+
+@st.fragment
+@counted
+def show_progress_entry(patient_id: int, prescription_id: int):
+    """Session entry form; sliders and inputs cause no rerun until it is submitted"""
+    if st.session_state.pop('progress_recorded', False):
+        st.success("Progress recorded successfully!")
+    
+    with st.form("record_progress", clear_on_submit=True):
+        date = st.date_input("Date")
+        duration = st.number_input("Exercise Duration (minutes)", min_value=0)
+        difficulty = st.slider("Difficulty Level (1-5)", 1, 5)
+        pain = st.slider("Pain Level (0-10)", 0, 10)
+        notes = st.text_area("Session Notes")
+        submitted = st.form_submit_button("Record Progress")
+    
+    if submitted:
+        try:
+            with clinic_session() as db:
+                progress = crud.record_progress(
+                    db=db,
+                    patient_id=patient_id,
+                    prescription_id=prescription_id,
+                    date=date,
+                    duration=duration,
+                    difficulty_level=difficulty,
+                    pain_level=pain,
+                    notes=notes
+                )
+                # Per-patient progress frames survive reruns and are updated in place on insert
+                record_in_frame(st.session_state.setdefault('progress_frames', {}), progress)
+            st.session_state['progress_recorded'] = True
+        except Exception as e:
+            st.error(f"Error recording progress: {str(e)}")
+            st.exception(e)
+            return
+        # The chart panel is a separate fragment; refresh it with the new session
+        st.rerun()
+
+@st.fragment
+@counted
+def show_progress_charts(patient_id: int):
+    """Chart panel; changing the date range reruns only this fragment"""
+    # pandas and altair are only loaded once a chart is actually drawn
+    from src.visualizations import display_progress_frame
+    
+    today = datetime.now().date()
+    window = st.date_input(
+        "Date range",
+        value=(today - timedelta(days=PROGRESS_WINDOW_DAYS), today),
+        key="progress_window"
+    )
+    if len(window) != 2:
+        st.info("Select an end date to show the range")
+        return
+    start, end = window
+    
+    try:
+        with clinic_session() as db:
+            # Revalidated with a max(id)/count check instead of reloading the window
+            progress_frames = st.session_state.setdefault('progress_frames', {})
+            frame = get_progress_frame(db, patient_id, progress_frames, start, end)
+            
+            # The five newest sessions come straight off the index, whatever the window
+            recent_entries = crud.get_patient_progress(db, patient_id, limit=RECENT_ENTRIES)
+            
+            display_progress_frame(frame.dataframe(), frame.stats)
             
-            # Show recent entries in a table
-            if progress_history:
+            if recent_entries:
                 st.subheader("Recent Progress Entries")
                 with st.expander("View Details"):
-                    for entry in progress_history[:5]:  # Show last 5 entries
+                    for entry in recent_entries:
                         st.write(f"Date: {entry.date.strftime('%Y-%m-%d')}")
                         st.write(f"Duration: {entry.duration} minutes")
                         st.write(f"Difficulty: {entry.difficulty_level}/5")
@@ -356,13 +685,75 @@ def show_progress_tracking():
                         if entry.notes:
                             st.write(f"Notes: {entry.notes}")
                         st.write("---")
-            
     except Exception as e:
         st.error(f"Database error: {str(e)}")
         st.exception(e)
-    finally:
-        if 'db' in locals():
-            db.close()
+
+LIVE_REFRESH_SECONDS = 5
+LIVE_FEED_SIZE = 20
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def show_live_activity():
+    """Live feed that pulls only change-log events newer than its last sequence number"""
+    clinic_id = st.session_state.get('clinic_id', DEFAULT_CLINIC)
+    subscriber_key = f"live_subscriber_{clinic_id}"
+    feed_key = f"live_feed_{clinic_id}"
+    
+    # Runs on its own timer outside main's rerun session, so it opens its own
+    with registry.session(clinic_id) as db:
+        if subscriber_key not in st.session_state:
+            start = ChangeSubscriber.from_latest(db).cursor
+            st.session_state[subscriber_key] = ChangeSubscriber(cursor=max(0, start - LIVE_FEED_SIZE))
+            st.session_state[feed_key] = []
+            first_poll = True
+        else:
+            first_poll = False
+        changes = st.session_state[subscriber_key].poll(db)
+    
+    feed = st.session_state[feed_key]
+    feed[:0] = [
+        f"#{change.seq} {change.changed_at:%H:%M:%S} {change.op} {change.table_name} {change.row_id}"
+        for change in reversed(changes)
+    ]
+    del feed[LIVE_FEED_SIZE:]
+    
+    st.subheader("Live Activity")
+    st.caption(f"Refreshes every {LIVE_REFRESH_SECONDS}s · cursor #{st.session_state[subscriber_key].cursor}")
+    st.code("\n".join(feed) if feed else "No activity yet", language=None)
+    
+    # New sessions can raise or settle alerts, so refresh the whole page only when they arrive
+    if not first_poll and any(change.table_name == "progress" for change in changes):
+        st.rerun()
+
+@profiled
+def show_monitoring():
+    """Show open alerts across all patients"""
+    st.header("Monitoring")
+    
+    show_live_activity()
+    
+    try:
+        db = get_db_session()
+        crud.check_missed_sessions(db)
+        open_alerts = crud.list_open_alerts(db)
+        
+        if not open_alerts:
+            st.success("No open alerts")
+            return
+        
+        st.subheader(f"Open Alerts ({len(open_alerts)})")
+        for alert in open_alerts:
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.write(f"**{alert.patient.name}** (ID: {alert.patient_id}) - {alert.kind.replace('_', ' ').title()}")
+                st.caption(f"{alert.message} · {alert.created_at.strftime('%Y-%m-%d %H:%M')}")
+            with col2:
+                if st.button("Resolve", key=f"resolve_alert_{alert.id}"):
+                    crud.resolve_alert(db, alert.id)
+                    st.rerun()
+    except Exception as e:
+        st.error(f"Database error: {str(e)}")
+        st.exception(e)
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Table
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Index, Table
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.dialects.sqlite import JSON
 
@@ -53,7 +53,7 @@ class Exercise(Base):
     contraindications = Column(JSON)
     video_url = Column(String)
     image_url = Column(String)
-    condition_id = Column(Integer, ForeignKey('conditions.id'))
+    condition_id = Column(Integer, ForeignKey('conditions.id'), index=True)
     
     conditions = relationship("Condition", back_populates="exercises")
     prescriptions = relationship("Prescription", secondary=prescription_exercises, back_populates="exercises")
@@ -62,7 +62,7 @@ class Prescription(Base):
     __tablename__ = 'prescriptions'
     
     id = Column(Integer, primary_key=True)
-    patient_id = Column(Integer, ForeignKey('patients.id'))
+    patient_id = Column(Integer, ForeignKey('patients.id'), index=True)
     frequency = Column(String)
     duration = Column(String)
     notes = Column(String)
@@ -74,6 +74,9 @@ class Prescription(Base):
 
 class ProgressRecord(Base):
     __tablename__ = 'progress_records'
+    __table_args__ = (
+        Index('ix_progress_records_patient_date', 'patient_id', 'date'),
+    )
     
     id = Column(Integer, primary_key=True)
     patient_id = Column(Integer, ForeignKey('patients.id'))
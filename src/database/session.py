@@ -1,6 +1,6 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import QueuePool
 from .models import Base
 import os
 
@@ -9,7 +9,7 @@ DB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))
 os.makedirs(DB_DIR, exist_ok=True)
 
 # Create the database URL
-DB_PATH = os.path.join(DB_DIR, 'exercise_medicine.db')
+DB_PATH = os.environ.get("EAM_DB_PATH", os.path.join(DB_DIR, 'exercise_medicine.db'))
 DATABASE_URL = f"sqlite:///{DB_PATH}"
 print(f"Database path: {DB_PATH}")
 
@@ -17,7 +17,9 @@ print(f"Database path: {DB_PATH}")
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool
+    poolclass=QueuePool,
+    pool_size=int(os.environ.get("DB_POOL_SIZE", 5)),
+    max_overflow=int(os.environ.get("DB_POOL_MAX_OVERFLOW", 10))
 )
 
 # Create all tables
@@ -0,0 +1,80 @@
+import time
+from typing import Callable, Iterable, Iterator, List, Optional
+from sqlalchemy import event, func, select, text
+from sqlalchemy.orm import Session
+from .database import Base
+from . import models
+
+# Tables whose writes are captured in change_log
+TRACKED_TABLES = ["patients", "prescriptions", "progress"]
+
+_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS change_log_{table}_{op} AFTER {event} ON {table}
+BEGIN
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', {row}.id, '{op}');
+END
+"""
+
+def create_change_triggers(connection) -> None:
+    """Install the change-log triggers (idempotent)"""
+    for table in TRACKED_TABLES:
+        for op, sql_event, row in (("insert", "INSERT", "NEW"), ("update", "UPDATE", "NEW"), ("delete", "DELETE", "OLD")):
+            connection.execute(text(_TRIGGER.format(table=table, op=op, event=sql_event, row=row)))
+
+@event.listens_for(Base.metadata, "after_create")
+def _install_triggers(target, connection, **kw):
+    # Runs on every create_all, so existing databases and new shards both get the triggers
+    create_change_triggers(connection)
+
+def get_changes_since(
+    db: Session,
+    after_seq: int,
+    limit: int = 500,
+    tables: Optional[Iterable[str]] = None
+) -> List[models.ChangeLog]:
+    """Get change-log entries after a sequence number, oldest first"""
+    stmt = select(models.ChangeLog).where(models.ChangeLog.seq > after_seq)
+    if tables:
+        stmt = stmt.where(models.ChangeLog.table_name.in_(list(tables)))
+    return db.scalars(stmt.order_by(models.ChangeLog.seq).limit(limit)).all()
+
+def get_latest_seq(db: Session) -> int:
+    """Get the newest sequence number, or 0 when the log is empty"""
+    return db.execute(select(func.max(models.ChangeLog.seq))).scalar() or 0
+
+class ChangeSubscriber:
+    """Tail the change log from a cursor position"""
+
+    def __init__(self, cursor: int = 0, tables: Optional[Iterable[str]] = None, batch_size: int = 500):
+        self.cursor = cursor
+        self.tables = list(tables) if tables else None
+        self.batch_size = batch_size
+
+    @classmethod
+    def from_latest(cls, db: Session, **kwargs) -> "ChangeSubscriber":
+        """Subscriber that only sees changes made from now on"""
+        return cls(cursor=get_latest_seq(db), **kwargs)
+
+    def poll(self, db: Session) -> List[models.ChangeLog]:
+        """Fetch the next batch of changes and advance the cursor past them"""
+        changes = get_changes_since(db, self.cursor, self.batch_size, self.tables)
+        if changes:
+            self.cursor = changes[-1].seq
+        return changes
+
+    def tail(
+        self,
+        session_factory: Callable[[], Session],
+        interval: float = 1.0,
+        stop: Optional[Callable[[], bool]] = None
+    ) -> Iterator[List[models.ChangeLog]]:
+        """Yield batches of new changes as they arrive, polling every `interval` seconds"""
+        while stop is None or not stop():
+            with session_factory() as db:
+                changes = self.poll(db)
+                if changes:
+                    db.expunge_all()
+            if changes:
+                yield changes
+            elif interval:
+                time.sleep(interval)
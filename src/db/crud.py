@@ -1,12 +1,19 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
+from sqlalchemy import case, func, insert, lambda_stmt, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, joinedload
+from typing import Callable, Iterator, List, Optional
+from datetime import date, datetime, timedelta
+from src.adherence import compute_adherence, parse_targets, week_start
+from src import alerts
 from . import models
+from .segments import Segment, get_segment_patient_ids
 
 def list_all_patients(db: Session) -> List[models.Patient]:
     """List all patients in the database"""
     try:
-        patients = db.query(models.Patient).order_by(models.Patient.id.desc()).all()
+        patients = db.scalars(
+            lambda_stmt(lambda: select(models.Patient).order_by(models.Patient.id.desc()))
+        ).all()
         print(f"Found {len(patients)} patients in database")
         for patient in patients:
             print(f"Patient ID: {patient.id}, Name: {patient.name}")
@@ -36,8 +43,8 @@ def create_patient(
     return db_patient
 
 def get_patient(db: Session, patient_id: int) -> Optional[models.Patient]:
-    """Get a patient by ID"""
-    return db.query(models.Patient).filter(models.Patient.id == patient_id).first()
+    """Get a patient by ID (served from the identity map when already loaded)"""
+    return db.get(models.Patient, patient_id)
 
 def create_prescription(
     db: Session,
@@ -56,6 +63,24 @@ def create_prescription(
         notes=notes
     )
     db.add(db_prescription)
+    db.flush()
+    
+    # Parse the free-text targets once and make this the patient's active prescription
+    db.execute(
+        update(models.PrescriptionTarget)
+        .where(models.PrescriptionTarget.patient_id == patient_id)
+        .values(active=False)
+    )
+    sessions_per_week, minutes_per_session, defaulted = parse_targets(frequency, duration)
+    db.add(models.PrescriptionTarget(
+        prescription_id=db_prescription.id,
+        patient_id=patient_id,
+        sessions_per_week=sessions_per_week,
+        minutes_per_session=minutes_per_session,
+        defaulted=defaulted,
+        start_date=date.today(),
+        active=True
+    ))
     db.commit()
     db.refresh(db_prescription)
     return db_prescription
@@ -65,13 +90,13 @@ def get_patient_prescriptions(
     patient_id: int
 ) -> List[models.Prescription]:
     """Get all prescriptions for a patient"""
-    return db.query(models.Prescription).filter(
-        models.Prescription.patient_id == patient_id
-    ).all()
+    return db.scalars(lambda_stmt(
+        lambda: select(models.Prescription).where(models.Prescription.patient_id == patient_id)
+    )).all()
 
 def get_prescription(db: Session, prescription_id: int) -> Optional[models.Prescription]:
-    """Get a prescription by ID"""
-    return db.query(models.Prescription).filter(models.Prescription.id == prescription_id).first()
+    """Get a prescription by ID (served from the identity map when already loaded)"""
+    return db.get(models.Prescription, prescription_id)
 
 def record_progress(
     db: Session,
@@ -94,49 +119,593 @@ def record_progress(
         notes=notes
     )
     db.add(db_progress)
+    session = {
+        "patient_id": patient_id,
+        "prescription_id": prescription_id,
+        "date": date,
+        "duration": duration,
+        "pain_level": pain_level
+    }
+    _increment_adherence_weeks(db, [session])
+    _update_alert_states(db, [session])
     db.commit()
     db.refresh(db_progress)
     return db_progress
 
-def get_patient_progress(
-    db: Session,
-    patient_id: int
-) -> List[models.Progress]:
-    """Get all progress entries for a patient"""
-    return db.query(models.Progress).filter(
-        models.Progress.patient_id == patient_id
-    ).order_by(models.Progress.date.desc()).all()
+# Progress columns an offline session carries
+SYNC_FIELDS = ["patient_id", "prescription_id", "date", "duration", "difficulty_level", "pain_level", "notes"]
 
-def record_progress(
+# Keeps IN (...) lookups well under SQLite's bound-variable limit
+SYNC_LOOKUP_CHUNK = 500
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _session_datetime(value) -> datetime:
+    # Offline entries travel as ISO strings; the progress table stores datetimes
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    return value
+
+def merge_progress_batch(db: Session, entries: List[dict]) -> dict:
+    """Merge a batch of offline progress entries, keyed by client ID, in one transaction.
+
+    Entries merged by an earlier sync come back as duplicates with their server ID,
+    so a batch can be resent safely. Entries whose prescription is unknown or belongs
+    to another patient are rejected with a reason. Returns
+    {"accepted": {client_id: progress_id}, "duplicates": {...}, "rejected": {client_id: reason}}.
+    """
+    result = {"accepted": {}, "duplicates": {}, "rejected": {}}
+    batch = {}
+    for entry in entries:
+        batch.setdefault(entry["client_id"], entry)  # the first copy wins within a batch
+    
+    for chunk in _chunks(list(batch), SYNC_LOOKUP_CHUNK):
+        result["duplicates"].update(db.execute(
+            select(models.ProgressSync.client_id, models.ProgressSync.progress_id)
+            .where(models.ProgressSync.client_id.in_(chunk))
+        ).all())
+    
+    pending = [entry for client_id, entry in batch.items() if client_id not in result["duplicates"]]
+    owners = {}
+    for chunk in _chunks(list({entry["prescription_id"] for entry in pending}), SYNC_LOOKUP_CHUNK):
+        owners.update(db.execute(
+            select(models.Prescription.id, models.Prescription.patient_id)
+            .where(models.Prescription.id.in_(chunk))
+        ).all())
+    
+    sessions = []
+    for entry in pending:
+        owner = owners.get(entry["prescription_id"])
+        if owner is None:
+            result["rejected"][entry["client_id"]] = "unknown prescription"
+        elif owner != entry["patient_id"]:
+            result["rejected"][entry["client_id"]] = "prescription belongs to another patient"
+        else:
+            session = {field: entry.get(field) for field in SYNC_FIELDS}
+            session["date"] = _session_datetime(entry["date"])
+            sessions.append((entry["client_id"], session))
+    
+    if sessions:
+        # Running state is folded in the order the sessions happened, not the order they arrived
+        sessions.sort(key=lambda item: (item[1]["date"], item[0]))
+        progress_ids = db.scalars(
+            insert(models.Progress).returning(models.Progress.id, sort_by_parameter_order=True),
+            [session for _, session in sessions]
+        ).all()
+        accepted = dict(zip((client_id for client_id, _ in sessions), progress_ids))
+        db.execute(insert(models.ProgressSync), [
+            {"client_id": client_id, "progress_id": progress_id}
+            for client_id, progress_id in accepted.items()
+        ])
+        _increment_adherence_weeks(db, [session for _, session in sessions])
+        _update_alert_states(db, [session for _, session in sessions])
+        result["accepted"] = accepted
+    
+    db.commit()
+    return result
+
+def create_prescription_template(
     db: Session,
-    patient_id: int,
-    prescription_id: int,
-    date: datetime,
-    duration: int,
-    difficulty_level: int,
-    pain_level: int,
+    name: str,
+    exercises: List[dict],
+    frequency: str,
+    duration: str,
     notes: str
-) -> models.Progress:
-    """Record a progress entry"""
-    db_progress = models.Progress(
-        patient_id=patient_id,
-        prescription_id=prescription_id,
-        date=date,
+) -> models.PrescriptionTemplate:
+    """Create a reusable prescription template"""
+    db_template = models.PrescriptionTemplate(
+        name=name,
+        exercises=exercises,
+        frequency=frequency,
         duration=duration,
-        difficulty_level=difficulty_level,
-        pain_level=pain_level,
         notes=notes
     )
-    db.add(db_progress)
+    db.add(db_template)
     db.commit()
-    db.refresh(db_progress)
-    return db_progress
+    db.refresh(db_template)
+    return db_template
+
+def list_prescription_templates(db: Session) -> List[models.PrescriptionTemplate]:
+    """Get every prescription template by name"""
+    return db.scalars(select(models.PrescriptionTemplate).order_by(models.PrescriptionTemplate.name)).all()
+
+# Patients prescribed per executemany; also bounds the IN (...) of the target deactivation
+BULK_PRESCRIBE_CHUNK = SYNC_LOOKUP_CHUNK
+
+def bulk_prescribe(
+    db: Session,
+    template_id: int,
+    segment: Segment,
+    on_progress: Optional[Callable[[int, int], None]] = None
+) -> int:
+    """Prescribe a template to every patient in a segment in one transaction.
+
+    Prescriptions reference the template instead of copying its exercises, and each
+    patient's new target replaces their active one, as with create_prescription.
+    Rows are written in chunks so on_progress(done, total) can report between
+    them; nothing is committed until every chunk is in. Returns the number of
+    patients prescribed.
+    """
+    template = db.get(models.PrescriptionTemplate, template_id)
+    if template is None:
+        raise ValueError(f"Unknown prescription template {template_id}")
+    patient_ids = get_segment_patient_ids(db, segment)
+    sessions_per_week, minutes_per_session, defaulted = parse_targets(template.frequency, template.duration)
+    today = date.today()
+    
+    done = 0
+    try:
+        for chunk in _chunks(patient_ids, BULK_PRESCRIBE_CHUNK):
+            prescription_ids = db.scalars(
+                insert(models.Prescription).returning(models.Prescription.id, sort_by_parameter_order=True),
+                [{
+                    "patient_id": patient_id,
+                    "template_id": template.id,
+                    "frequency": template.frequency,
+                    "duration": template.duration,
+                    "notes": template.notes
+                } for patient_id in chunk]
+            ).all()
+            db.execute(
+                update(models.PrescriptionTarget)
+                .where(models.PrescriptionTarget.patient_id.in_(chunk))
+                .values(active=False)
+            )
+            db.execute(insert(models.PrescriptionTarget), [{
+                "prescription_id": prescription_id,
+                "patient_id": patient_id,
+                "sessions_per_week": sessions_per_week,
+                "minutes_per_session": minutes_per_session,
+                "defaulted": defaulted,
+                "start_date": today,
+                "active": True
+            } for patient_id, prescription_id in zip(chunk, prescription_ids)])
+            done += len(chunk)
+            if on_progress is not None:
+                on_progress(done, len(patient_ids))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return done
+
+def _window_bounds(start: Optional[date], end: Optional[date]) -> tuple:
+    # Progress dates are datetimes; the window covers whole days from start through end
+    start_at = datetime.combine(start, datetime.min.time()) if start else None
+    end_before = datetime.combine(end + timedelta(days=1), datetime.min.time()) if end else None
+    return start_at, end_before
 
 def get_patient_progress(
     db: Session,
-    patient_id: int
+    patient_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: Optional[int] = None
 ) -> List[models.Progress]:
-    """Get all progress entries for a patient"""
-    return db.query(models.Progress).filter(
-        models.Progress.patient_id == patient_id
-    ).order_by(models.Progress.date.desc()).all()
+    """Get a patient's progress entries, newest first, optionally within a date window.
+
+    Reads walk ix_progress_patient_date backwards, so a limit stops after that many rows.
+    """
+    start_at, end_before = _window_bounds(start, end)
+    stmt = lambda_stmt(lambda: select(models.Progress).where(models.Progress.patient_id == patient_id))
+    if start_at is not None:
+        stmt += lambda s: s.where(models.Progress.date >= start_at)
+    if end_before is not None:
+        stmt += lambda s: s.where(models.Progress.date < end_before)
+    stmt += lambda s: s.order_by(models.Progress.date.desc(), models.Progress.id.desc())
+    if limit is not None:
+        stmt += lambda s: s.limit(limit)
+    return db.scalars(stmt).all()
+
+def iter_patient_progress(
+    db: Session,
+    patient_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    chunk_size: int = 500
+) -> Iterator[List[models.Progress]]:
+    """Yield a patient's progress entries oldest first in chunks of `chunk_size`.
+
+    Each chunk is a keyset query resuming after the last (date, id) seen, so memory
+    stays bounded and no chunk rescans the rows before it.
+    """
+    start_at, end_before = _window_bounds(start, end)
+    after = None
+    while True:
+        stmt = select(models.Progress).where(models.Progress.patient_id == patient_id)
+        if start_at is not None:
+            stmt = stmt.where(models.Progress.date >= start_at)
+        if end_before is not None:
+            stmt = stmt.where(models.Progress.date < end_before)
+        if after is not None:
+            stmt = stmt.where(tuple_(models.Progress.date, models.Progress.id) > after)
+        chunk = db.scalars(
+            stmt.order_by(models.Progress.date, models.Progress.id).limit(chunk_size)
+        ).all()
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        after = (chunk[-1].date, chunk[-1].id)
+
+def get_progress_version(
+    db: Session,
+    patient_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None
+) -> tuple:
+    """Get (max id, count) of a patient's progress entries to revalidate cached history"""
+    start_at, end_before = _window_bounds(start, end)
+    stmt = (
+        select(func.max(models.Progress.id), func.count(models.Progress.id))
+        .where(models.Progress.patient_id == patient_id)
+    )
+    if start_at is not None:
+        stmt = stmt.where(models.Progress.date >= start_at)
+    if end_before is not None:
+        stmt = stmt.where(models.Progress.date < end_before)
+    max_id, count = db.execute(stmt).one()
+    return max_id or 0, count
+
+def _increment_adherence_weeks(db: Session, sessions: List[dict]) -> None:
+    """Add sessions to their prescriptions' weekly adherence counters in one upsert"""
+    weeks = {}
+    for session in sessions:
+        key = (session["prescription_id"], week_start(session["date"]))
+        week = weeks.setdefault(key, {
+            "prescription_id": key[0], "week_start": key[1], "sessions": 0, "minutes": 0
+        })
+        week["sessions"] += 1
+        week["minutes"] += session["duration"] or 0
+    
+    stmt = sqlite_insert(models.AdherenceWeek)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.AdherenceWeek.prescription_id, models.AdherenceWeek.week_start],
+        set_={
+            "sessions": models.AdherenceWeek.sessions + stmt.excluded.sessions,
+            "minutes": models.AdherenceWeek.minutes + stmt.excluded.minutes
+        }
+    )
+    db.execute(stmt, list(weeks.values()))
+
+def _update_alert_states(db: Session, sessions: List[dict]) -> None:
+    """Fold sessions into their patients' alert state in order and raise any alerts"""
+    patient_ids = list({session["patient_id"] for session in sessions})
+    states = {}
+    open_kinds = {patient_id: set() for patient_id in patient_ids}
+    for chunk in _chunks(patient_ids, SYNC_LOOKUP_CHUNK):
+        states.update(
+            (state.patient_id, state) for state in db.scalars(
+                select(models.PatientAlertState).where(models.PatientAlertState.patient_id.in_(chunk))
+            )
+        )
+        for patient_id, kind in db.execute(
+            select(models.Alert.patient_id, models.Alert.kind).where(
+                models.Alert.resolved_at.is_(None),
+                models.Alert.patient_id.in_(chunk)
+            )
+        ):
+            open_kinds[patient_id].add(kind)
+    
+    # A recorded session settles any open missed-sessions alert
+    for patient_id in patient_ids:
+        if alerts.MISSED_SESSIONS in open_kinds[patient_id]:
+            resolve_alerts(db, patient_id, alerts.MISSED_SESSIONS)
+    
+    for session in sessions:
+        patient_id = session["patient_id"]
+        state = states.get(patient_id)
+        if state is None:
+            state = states[patient_id] = models.PatientAlertState(
+                patient_id=patient_id, sessions=0, pain_cusum=0.0, duration_trend=0.0
+            )
+            db.add(state)
+        
+        raised = alerts.update_state(state, session["date"], session["pain_level"], session["duration"])
+        for kind, message, value in raised:
+            if kind not in open_kinds[patient_id]:
+                db.add(models.Alert(patient_id=patient_id, kind=kind, message=message, value=value))
+                open_kinds[patient_id].add(kind)
+
+def resolve_alerts(db: Session, patient_id: int, kind: str) -> None:
+    """Mark a patient's open alerts of one kind resolved (caller commits)"""
+    db.execute(
+        update(models.Alert).where(
+            models.Alert.resolved_at.is_(None),
+            models.Alert.patient_id == patient_id,
+            models.Alert.kind == kind
+        ).values(resolved_at=datetime.utcnow())
+    )
+
+def resolve_alert(db: Session, alert_id: int) -> None:
+    """Mark one alert resolved"""
+    db.execute(
+        update(models.Alert).where(models.Alert.id == alert_id).values(resolved_at=datetime.utcnow())
+    )
+    db.commit()
+
+def check_missed_sessions(db: Session, today: Optional[date] = None) -> int:
+    """Raise missed-sessions alerts from the per-patient state without scanning history"""
+    today = today or date.today()
+    target = models.PrescriptionTarget
+    state = models.PatientAlertState
+    last_seen = func.coalesce(state.last_session_date, target.start_date)
+    days_since = func.julianday(today.isoformat()) - func.julianday(last_seen)
+    open_missed = select(models.Alert.id).where(
+        models.Alert.resolved_at.is_(None),
+        models.Alert.patient_id == target.patient_id,
+        models.Alert.kind == alerts.MISSED_SESSIONS
+    ).exists()
+    
+    overdue = db.execute(
+        select(target.patient_id, days_since.label("days_since"), target.sessions_per_week)
+        .outerjoin(state, state.patient_id == target.patient_id)
+        .where(
+            target.active.is_(True),
+            days_since > 7.0 * alerts.MISSED_SESSIONS_ALLOWED / target.sessions_per_week,
+            ~open_missed
+        )
+    ).all()
+    
+    for patient_id, days, sessions_per_week in overdue:
+        db.add(models.Alert(
+            patient_id=patient_id,
+            kind=alerts.MISSED_SESSIONS,
+            message=f"No session for {days:.0f} days (target {sessions_per_week} per week)",
+            value=float(days)
+        ))
+    if overdue:
+        db.commit()
+    return len(overdue)
+
+def list_open_alerts(db: Session) -> List[models.Alert]:
+    """Get all open alerts across patients, newest first"""
+    return db.scalars(
+        select(models.Alert)
+        .options(joinedload(models.Alert.patient))
+        .where(models.Alert.resolved_at.is_(None))
+        .order_by(models.Alert.created_at.desc())
+    ).all()
+
+def get_adherence_totals(db: Session, as_of: date, weeks: int = 4) -> list:
+    """Get session totals over the completed weeks in the window for every active prescription in one grouped query"""
+    current_week = week_start(as_of)
+    window_start = current_week - timedelta(weeks=weeks)
+    week = models.AdherenceWeek
+    in_window = (week.week_start >= window_start) & (week.week_start < current_week)
+    
+    totals = select(
+        week.prescription_id,
+        func.sum(case((in_window, week.sessions), else_=0)).label("sessions"),
+        func.sum(case((in_window, week.minutes), else_=0)).label("minutes"),
+        func.sum(case((week.week_start == current_week, week.sessions), else_=0)).label("this_week"),
+        func.max(week.week_start).label("last_active_week")
+    ).group_by(week.prescription_id).subquery()
+    
+    target = models.PrescriptionTarget
+    stmt = select(
+        target.prescription_id,
+        target.patient_id,
+        models.Patient.name,
+        target.sessions_per_week,
+        target.minutes_per_session,
+        target.defaulted,
+        target.start_date,
+        totals.c.sessions,
+        totals.c.minutes,
+        totals.c.this_week,
+        totals.c.last_active_week
+    ).join(
+        models.Patient, models.Patient.id == target.patient_id
+    ).outerjoin(
+        totals, totals.c.prescription_id == target.prescription_id
+    ).where(target.active.is_(True))
+    
+    return db.execute(stmt).all()
+
+def get_weekly_adherence(db: Session, as_of: Optional[date] = None, weeks: int = 4) -> List[dict]:
+    """Get weekly adherence ratios for every active prescription"""
+    as_of = as_of or date.today()
+    return compute_adherence(get_adherence_totals(db, as_of, weeks), as_of, weeks)
+
+def backfill_adherence(db: Session) -> int:
+    """Create targets and weekly counters for prescriptions created before adherence tracking"""
+    target = models.PrescriptionTarget
+    missing = db.execute(
+        select(models.Prescription)
+        .outerjoin(target, target.prescription_id == models.Prescription.id)
+        .where(target.prescription_id.is_(None))
+        .order_by(models.Prescription.id)
+    ).scalars().all()
+    if not missing:
+        return 0
+    
+    has_active = set(db.execute(
+        select(target.patient_id).where(target.active.is_(True))
+    ).scalars())
+    latest = {}
+    for prescription in missing:
+        latest[prescription.patient_id] = prescription.id
+    
+    targets = {p.id: parse_targets(p.frequency, p.duration) for p in missing}
+    db.execute(insert(target), [
+        {
+            "prescription_id": p.id,
+            "patient_id": p.patient_id,
+            "sessions_per_week": targets[p.id][0],
+            "minutes_per_session": targets[p.id][1],
+            "defaulted": targets[p.id][2],
+            "start_date": (p.created_at or datetime.utcnow()).date(),
+            "active": p.patient_id not in has_active and latest[p.patient_id] == p.id
+        }
+        for p in missing
+    ])
+    
+    # Rebuild the weekly counters from history in one grouped query (weeks start on Monday).
+    # Sessions recorded since the upgrade already have counters; the rebuilt totals replace them.
+    progress = models.Progress
+    progress_week = func.date(progress.date, "weekday 0", "-6 days")
+    stmt = sqlite_insert(models.AdherenceWeek).from_select(
+        ["prescription_id", "week_start", "sessions", "minutes"],
+        select(
+            progress.prescription_id,
+            progress_week,
+            func.count(progress.id),
+            func.coalesce(func.sum(progress.duration), 0)
+        ).where(
+            progress.prescription_id.in_([p.id for p in missing])
+        ).group_by(progress.prescription_id, progress_week)
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.AdherenceWeek.prescription_id, models.AdherenceWeek.week_start],
+        set_={"sessions": stmt.excluded.sessions, "minutes": stmt.excluded.minutes}
+    ))
+    db.commit()
+    return len(missing)
+
+RECORD_COUNT_KEYS = ("patients", "prescriptions", "sessions")
+
+def get_record_counts(db: Session) -> dict:
+    """Count patients, prescriptions and progress sessions in one query"""
+    patients, prescriptions, sessions = db.execute(select(
+        select(func.count(models.Patient.id)).scalar_subquery(),
+        select(func.count(models.Prescription.id)).scalar_subquery(),
+        select(func.count(models.Progress.id)).scalar_subquery()
+    )).one()
+    return dict(zip(RECORD_COUNT_KEYS, (patients, prescriptions, sessions)))
+
+def get_cohort_totals(db: Session) -> List[dict]:
+    """Get mergeable per-decade-of-age totals (sums, not averages) of patients and sessions"""
+    age_band = (models.Patient.age // 10) * 10
+    rows = db.execute(
+        select(
+            age_band.label("age_band"),
+            func.count(func.distinct(models.Patient.id)),
+            func.count(models.Progress.id),
+            func.coalesce(func.sum(models.Progress.duration), 0),
+            func.coalesce(func.sum(models.Progress.pain_level), 0)
+        ).outerjoin(
+            models.Progress, models.Progress.patient_id == models.Patient.id
+        ).group_by(age_band)
+    ).all()
+    return [
+        {"age_band": band, "patients": patients, "sessions": sessions,
+         "duration_sum": duration_sum, "pain_sum": pain_sum}
+        for band, patients, sessions, duration_sum, pain_sum in rows
+    ]
+
+def get_all_progress_rows(db: Session) -> list:
+    """Get every progress row with its patient's name in one query, ordered by patient.
+
+    Patients without sessions appear once with the progress columns set to None.
+    """
+    return db.execute(
+        select(
+            models.Patient.id.label("patient_id"),
+            models.Patient.name,
+            models.Progress.id,
+            models.Progress.date,
+            models.Progress.duration,
+            models.Progress.difficulty_level,
+            models.Progress.pain_level,
+            models.Progress.notes
+        ).outerjoin(
+            models.Progress, models.Progress.patient_id == models.Patient.id
+        ).order_by(models.Patient.id, models.Progress.id)
+    ).all()
+
+# Roster columns clients may sort by, and how many rows a page holds
+ROSTER_SORTS = ["last_session", "sessions_30d", "latest_pain", "active_prescriptions", "name", "age"]
+ROSTER_PAGE_SIZE = 25
+ROSTER_ACTIVITY_DAYS = 30
+
+# NULLs (no sessions yet) sort as these values so keyset comparisons stay total
+_ROSTER_NULL_SORT = {"last_session": datetime.min, "latest_pain": -1}
+
+def get_patient_roster(
+    db: Session,
+    sort: str = "last_session",
+    descending: bool = True,
+    after: Optional[tuple] = None,
+    limit: int = ROSTER_PAGE_SIZE,
+    as_of: Optional[date] = None
+) -> List[dict]:
+    """Get one page of the clinician roster with per-patient activity, in a single query.
+
+    Each row carries the last session date, sessions in the last 30 days, the
+    latest pain level and the active prescription count. Pages are keyset
+    paginated: pass the previous page's last (row[sort], row["id"]) as `after`.
+    """
+    if sort not in ROSTER_SORTS:
+        raise ValueError(f"Unknown roster sort: {sort!r}")
+    as_of = as_of or date.today()
+    since = datetime.combine(as_of - timedelta(days=ROSTER_ACTIVITY_DAYS), datetime.min.time())
+    
+    # One grouped pass over progress in (patient_id, date) index order
+    activity = select(
+        models.Progress.patient_id,
+        func.max(models.Progress.date).label("last_session"),
+        func.sum(case((models.Progress.date >= since, 1), else_=0)).label("sessions_30d")
+    ).group_by(models.Progress.patient_id).subquery()
+    
+    # Newest session per patient is one backwards step on the same index
+    latest_pain = select(models.Progress.pain_level).where(
+        models.Progress.patient_id == models.Patient.id
+    ).order_by(models.Progress.date.desc(), models.Progress.id.desc()).limit(1).scalar_subquery()
+    
+    active = select(
+        models.PrescriptionTarget.patient_id,
+        func.count().label("active_prescriptions")
+    ).where(models.PrescriptionTarget.active.is_(True)).group_by(models.PrescriptionTarget.patient_id).subquery()
+    
+    roster = select(
+        models.Patient.id,
+        models.Patient.name,
+        models.Patient.age,
+        activity.c.last_session,
+        func.coalesce(activity.c.sessions_30d, 0).label("sessions_30d"),
+        latest_pain.label("latest_pain"),
+        func.coalesce(active.c.active_prescriptions, 0).label("active_prescriptions")
+    ).outerjoin(
+        activity, activity.c.patient_id == models.Patient.id
+    ).outerjoin(
+        active, active.c.patient_id == models.Patient.id
+    ).subquery("roster")
+    
+    column = roster.c[sort]
+    if sort in _ROSTER_NULL_SORT:
+        column = func.coalesce(column, _ROSTER_NULL_SORT[sort])
+    stmt = select(roster)
+    if after is not None:
+        after_value, after_id = after
+        if after_value is None:
+            after_value = _ROSTER_NULL_SORT.get(sort)
+        key = tuple_(column, roster.c.id)
+        stmt = stmt.where(key < (after_value, after_id) if descending else key > (after_value, after_id))
+    order = (column.desc(), roster.c.id.desc()) if descending else (column, roster.c.id)
+    return [dict(row._mapping) for row in db.execute(stmt.order_by(*order).limit(limit))]
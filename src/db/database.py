@@ -1,13 +1,17 @@
 import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from sqlalchemy import create_engine, event, inspect
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
+from sqlalchemy.pool import QueuePool
 
 # Get absolute path for database
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
 DB_FILE = 'exercise_medicine.db'
-DB_PATH = os.path.join(PROJECT_ROOT, 'data', DB_FILE)
+DB_PATH = os.environ.get("EAM_DB_PATH", os.path.join(PROJECT_ROOT, 'data', DB_FILE))
 
 # Ensure data directory exists
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
@@ -15,35 +19,111 @@ os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 # Create database URL with absolute path
 DATABASE_URL = f"sqlite:///{DB_PATH}"
 
-print("="*50)
-print("Database Configuration")
-print("="*50)
-print(f"Current Directory: {CURRENT_DIR}")
-print(f"Project Root: {PROJECT_ROOT}")
-print(f"Database Path: {DB_PATH}")
-print(f"Database URL: {DATABASE_URL}")
-
 # Create base class for declarative models
 Base = declarative_base()
 
+@event.listens_for(Base.metadata, "after_create")
+def _add_missing_columns(target, connection, **kw):
+    """create_all never alters existing tables; add nullable columns introduced since then"""
+    inspector = inspect(connection)
+    for table in target.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable and not column.primary_key:
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}')
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_missing_indexes(target, connection, **kw):
+    """create_all only indexes tables it creates; add indexes introduced since then"""
+    for table in target.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
 # Import models to ensure they're registered with Base
 from .models import Patient, Condition, Prescription
+from . import changes  # Registers the change-log triggers with create_all
+from . import segments  # Registers the segment side-table triggers with create_all
+
+# Connection pool sizing: one connection per concurrent rerun, with overflow for bursts
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+POOL_MAX_OVERFLOW = int(os.environ.get("DB_POOL_MAX_OVERFLOW", 10))
+POOL_TIMEOUT = 30
+SQLITE_BUSY_TIMEOUT_MS = 5000
+
+# SQL logging is on by default; load tests and benchmarks switch it off with EAM_SQL_ECHO=0
+SQL_ECHO = os.environ.get("EAM_SQL_ECHO", "1") not in ("", "0", "false")
+
+def create_sqlite_engine(database_url: str):
+    """Create a pooled SQLite engine with the app's connection settings"""
+    sqlite_engine = create_engine(
+        database_url,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        echo=SQL_ECHO  # Enable SQL logging
+    )
+    event.listen(sqlite_engine, "do_connect", _time_connect)
+    event.listen(sqlite_engine, "connect", _configure_connection)
+    event.listen(sqlite_engine, "checkout", _count_checkout)
+    event.listen(sqlite_engine, "before_cursor_execute", _count_query)
+    return sqlite_engine
+
+# Connection setup statistics, used to measure how much pooling saves
+connection_stats = {"connects": 0, "connect_seconds": 0.0, "checkouts": 0}
+
+def _time_connect(dialect, conn_rec, cargs, cparams):
+    conn_rec.info["connect_started"] = time.perf_counter()
+
+def _configure_connection(dbapi_connection, connection_record):
+    """Let readers and the writer work concurrently and wait on locks instead of failing"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+    started = connection_record.info.pop("connect_started", None)
+    connection_stats["connects"] += 1
+    if started is not None:
+        connection_stats["connect_seconds"] += time.perf_counter() - started
+
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    connection_stats["checkouts"] += 1
+
+# Statements sent per thread; Streamlit reruns and fragments run on the session's script thread
+_queries = threading.local()
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    _queries.count = getattr(_queries, "count", 0) + 1
+
+def query_count() -> int:
+    """Statements this thread has sent so far; diff two readings to count a block's queries"""
+    return getattr(_queries, "count", 0)
 
 # Create engine with SQLite configuration
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    echo=True  # Enable SQL logging
-)
+engine = create_sqlite_engine(DATABASE_URL)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# One session per thread; Streamlit runs each browser session's reruns on its own thread
+ScopedSession = scoped_session(SessionLocal)
+
 def init_db():
     """Initialize the database"""
+    print("="*50)
+    print("Database Configuration")
+    print("="*50)
+    print(f"Current Directory: {CURRENT_DIR}")
+    print(f"Project Root: {PROJECT_ROOT}")
+    print(f"Database Path: {DB_PATH}")
+    print(f"Database URL: {DATABASE_URL}")
+    
     try:
         # Enable SQL logging
-        engine.echo = True
+        engine.echo = SQL_ECHO
         
         # Create all tables
         Base.metadata.create_all(bind=engine)
@@ -84,5 +164,22 @@ def get_db():
     finally:
         db.close()
 
-# Initialize database on module import
-init_db()
+@contextmanager
+def rerun_session(bind=None):
+    """Provide the scoped session for one Streamlit rerun and release it afterwards.
+
+    `bind` routes the session to another engine, such as a clinic shard. Fragments
+    rerun on their own, so they open one too; nested inside a full rerun it is reused.
+    """
+    if ScopedSession.registry.has():
+        # A fragment rendered during a full rerun shares the rerun's session
+        yield ScopedSession()
+        return
+    db = ScopedSession(bind=bind) if bind is not None else ScopedSession()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        ScopedSession.remove()
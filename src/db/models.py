@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, DateTime, Date, Boolean, Float, ForeignKey, Index, Table
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from sqlalchemy.dialects.sqlite import JSON
 from datetime import datetime
 from .database import Base
@@ -7,8 +8,10 @@ from .database import Base
 # Association tables
 patient_conditions = Table(
     'patient_conditions', Base.metadata,
-    Column('patient_id', Integer, ForeignKey('patients.id')),
-    Column('condition_id', Integer, ForeignKey('conditions.id'))
+    Column('patient_id', Integer, ForeignKey('patients.id'), primary_key=True),
+    Column('condition_id', Integer, ForeignKey('conditions.id'), primary_key=True),
+    # Segment lookups go from a condition to its patients
+    Index('ix_patient_conditions_condition_patient', 'condition_id', 'patient_id')
 )
 
 class Patient(Base):
@@ -16,7 +19,7 @@ class Patient(Base):
     
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
-    age = Column(Integer, nullable=False)
+    age = Column(Integer, nullable=False, index=True)
     risk_factors = Column(JSON)
     goals = Column(JSON)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -38,18 +41,25 @@ class Prescription(Base):
     __tablename__ = 'prescriptions'
     
     id = Column(Integer, primary_key=True)
-    patient_id = Column(Integer, ForeignKey('patients.id'))
+    patient_id = Column(Integer, ForeignKey('patients.id'), index=True)
     exercises = Column(JSON)  # Store as JSON for simplicity in MVP
     frequency = Column(String)
     duration = Column(String)
     notes = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    template_id = Column(Integer, ForeignKey('prescription_templates.id'), nullable=True)
     
     patient = relationship("Patient", back_populates="prescriptions")
     progress_entries = relationship("Progress", back_populates="prescription")
+    template = relationship("PrescriptionTemplate")  # Bulk-issued rows keep exercises on the template
 
 class Progress(Base):
     __tablename__ = 'progress'
+    __table_args__ = (
+        # Progress history by patient and date
+        Index('ix_progress_patient_date', 'patient_id', 'date'),
+        Index('ix_progress_prescription_id', 'prescription_id'),
+    )
     
     id = Column(Integer, primary_key=True)
     patient_id = Column(Integer, ForeignKey('patients.id'))
@@ -63,3 +73,108 @@ class Progress(Base):
     
     patient = relationship("Patient", back_populates="progress_entries")
     prescription = relationship("Prescription", back_populates="progress_entries")
+
+
+class PrescriptionTarget(Base):
+    __tablename__ = 'prescription_targets'
+    
+    # Structured frequency/duration parsed once when the prescription is created
+    prescription_id = Column(Integer, ForeignKey('prescriptions.id'), primary_key=True)
+    patient_id = Column(Integer, ForeignKey('patients.id'), index=True)
+    sessions_per_week = Column(Integer)
+    minutes_per_session = Column(Integer)
+    defaulted = Column(Boolean, default=False)  # frequency or duration text not understood; defaults used
+    start_date = Column(Date)
+    active = Column(Boolean, default=True, index=True)
+
+class AdherenceWeek(Base):
+    __tablename__ = 'adherence_weeks'
+    
+    # Sessions recorded per prescription per week (weeks start on Monday)
+    prescription_id = Column(Integer, ForeignKey('prescriptions.id'), primary_key=True)
+    week_start = Column(Date, primary_key=True)
+    sessions = Column(Integer, default=0, nullable=False)
+    minutes = Column(Integer, default=0, nullable=False)
+
+class PatientAlertState(Base):
+    __tablename__ = 'patient_alert_state'
+    
+    # O(1) running state per patient, updated on every recorded session
+    patient_id = Column(Integer, ForeignKey('patients.id'), primary_key=True)
+    sessions = Column(Integer, default=0, nullable=False)
+    pain_ewma = Column(Float)
+    pain_cusum = Column(Float, default=0.0, nullable=False)
+    duration_ewma = Column(Float)
+    duration_trend = Column(Float, default=0.0, nullable=False)  # EWMA of session-to-session change
+    last_duration = Column(Integer)
+    last_session_date = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Alert(Base):
+    __tablename__ = 'alerts'
+    __table_args__ = (
+        Index('ix_alerts_open', 'resolved_at', 'patient_id', 'kind'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    patient_id = Column(Integer, ForeignKey('patients.id'), nullable=False)
+    kind = Column(String, nullable=False)  # pain_spike, duration_decline, missed_sessions
+    message = Column(String)
+    value = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    resolved_at = Column(DateTime, nullable=True)
+    
+    patient = relationship("Patient")
+
+class ChangeLog(Base):
+    __tablename__ = 'change_log'
+    # AUTOINCREMENT keeps sequence numbers strictly increasing, never reused
+    __table_args__ = {'sqlite_autoincrement': True}
+    
+    # Append-only; rows are written by the triggers in src/db/changes.py
+    seq = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)  # insert, update, delete
+    changed_at = Column(DateTime, server_default=func.current_timestamp())
+
+class PatientRiskFactor(Base):
+    __tablename__ = 'patient_risk_factors'
+    __table_args__ = (
+        Index('ix_patient_risk_factors_patient_id', 'patient_id'),
+    )
+    
+    # One row per entry of patients.risk_factors, kept in sync by the triggers in src/db/segments.py
+    risk_factor = Column(String, primary_key=True)
+    patient_id = Column(Integer, ForeignKey('patients.id'), primary_key=True)
+
+class PatientGoal(Base):
+    __tablename__ = 'patient_goals'
+    __table_args__ = (
+        Index('ix_patient_goals_patient_id', 'patient_id'),
+    )
+    
+    # One row per entry of patients.goals, kept in sync by the triggers in src/db/segments.py
+    goal = Column(String, primary_key=True)
+    patient_id = Column(Integer, ForeignKey('patients.id'), primary_key=True)
+
+class ProgressSync(Base):
+    __tablename__ = 'progress_sync'
+    
+    # Client-generated ID of every offline session merged by crud.merge_progress_batch;
+    # a resent session finds its row here and is not inserted twice
+    client_id = Column(String, primary_key=True)
+    progress_id = Column(Integer, ForeignKey('progress.id'), nullable=False)
+    synced_at = Column(DateTime, default=datetime.utcnow)
+
+class PrescriptionTemplate(Base):
+    __tablename__ = 'prescription_templates'
+    
+    # A reusable protocol; prescriptions issued from it reference it instead of copying the exercises
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    exercises = Column(JSON)
+    frequency = Column(String)
+    duration = Column(String)
+    notes = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,147 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+from sqlalchemy import event, func, inspect, select, text
+from sqlalchemy.orm import Session, aliased
+from .database import Base
+from . import models
+
+# patients.risk_factors / patients.goals are mirrored into these (table, value column) side tables
+SIDE_TABLES = [("risk_factors", "patient_risk_factors", "risk_factor"), ("goals", "patient_goals", "goal")]
+
+# json_each yields one row per array element; non-text entries (e.g. a JSON null) are skipped
+_SYNC_ROWS = "SELECT {row}.id, value FROM {source}json_each({row}.{column}) WHERE type = 'text'"
+
+_TRIGGERS = [
+    """
+CREATE TRIGGER IF NOT EXISTS segments_{table}_insert AFTER INSERT ON patients
+BEGIN
+    INSERT OR IGNORE INTO {table} (patient_id, {value}) {new_rows};
+END
+""",
+    """
+CREATE TRIGGER IF NOT EXISTS segments_{table}_update AFTER UPDATE OF {column} ON patients
+BEGIN
+    DELETE FROM {table} WHERE patient_id = OLD.id;
+    INSERT OR IGNORE INTO {table} (patient_id, {value}) {new_rows};
+END
+""",
+    """
+CREATE TRIGGER IF NOT EXISTS segments_{table}_delete AFTER DELETE ON patients
+BEGIN
+    DELETE FROM {table} WHERE patient_id = OLD.id;
+END
+""",
+]
+
+# Names of the triggers above, one set per side table
+_TRIGGER_NAMES = [
+    f"segments_{table}_{op}" for _, table, _ in SIDE_TABLES for op in ("insert", "update", "delete")
+]
+
+def segment_triggers_installed(connection) -> bool:
+    """Check whether every segment trigger already exists"""
+    existing = set(connection.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'segments_%'")
+    ).scalars())
+    return existing.issuperset(_TRIGGER_NAMES)
+
+def create_segment_triggers(connection) -> None:
+    """Install the triggers that mirror the JSON arrays into the side tables (idempotent)"""
+    for column, table, value in SIDE_TABLES:
+        new_rows = _SYNC_ROWS.format(row="NEW", source="", column=column)
+        for trigger in _TRIGGERS:
+            connection.execute(text(trigger.format(table=table, value=value, column=column, new_rows=new_rows)))
+
+def backfill_segments(connection) -> None:
+    """Fill the side tables from patients that predate the triggers (idempotent)"""
+    for column, table, value in SIDE_TABLES:
+        rows = _SYNC_ROWS.format(row="patients", source="patients, ", column=column)
+        connection.execute(text(f"INSERT OR IGNORE INTO {table} (patient_id, {value}) {rows}"))
+
+def migrate_patient_conditions_key(connection) -> None:
+    """Rebuild a patient_conditions table that predates its composite primary key (idempotent).
+
+    SQLite cannot add a primary key to an existing table, so the links are
+    copied into a fresh table; duplicate and incomplete links are dropped.
+    """
+    if inspect(connection).get_pk_constraint("patient_conditions")["constrained_columns"]:
+        return
+    table = models.patient_conditions
+    for index in table.indexes:
+        # Index names are schema-wide, so free them for the rebuilt table
+        connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    connection.execute(text("ALTER TABLE patient_conditions RENAME TO patient_conditions_old"))
+    table.create(connection)
+    connection.execute(text(
+        "INSERT OR IGNORE INTO patient_conditions (patient_id, condition_id) "
+        "SELECT patient_id, condition_id FROM patient_conditions_old "
+        "WHERE patient_id IS NOT NULL AND condition_id IS NOT NULL"
+    ))
+    connection.execute(text("DROP TABLE patient_conditions_old"))
+
+@event.listens_for(Base.metadata, "after_create")
+def _install_segment_sync(target, connection, **kw):
+    migrate_patient_conditions_key(connection)
+    # Once the triggers exist they keep the side tables in sync, so only the first install backfills
+    backfilled = segment_triggers_installed(connection)
+    create_segment_triggers(connection)
+    if not backfilled:
+        backfill_segments(connection)
+
+@dataclass
+class Segment:
+    """A patient segment: every listed risk factor, goal and condition, within the age range"""
+    risk_factors: List[str] = field(default_factory=list)
+    goals: List[str] = field(default_factory=list)
+    conditions: List[str] = field(default_factory=list)
+    min_age: Optional[int] = None
+    max_age: Optional[int] = None
+
+    def describe(self) -> str:
+        parts = [f"risk factor {name}" for name in self.risk_factors]
+        parts += [f"goal {name}" for name in self.goals]
+        parts += [f"condition {name}" for name in self.conditions]
+        if self.min_age is not None or self.max_age is not None:
+            parts.append(f"age {self.min_age if self.min_age is not None else 0}-"
+                         f"{self.max_age if self.max_age is not None else '∞'}")
+        return ", ".join(parts) or "all patients"
+
+def segment_query(segment: Segment):
+    """Compile a segment into a SELECT of matching patient IDs.
+
+    Each filter value is one join against an index keyed on that value, so the
+    database intersects short index ranges instead of parsing JSON per patient.
+    """
+    stmt = select(models.Patient.id)
+    for name in segment.risk_factors:
+        risk = aliased(models.PatientRiskFactor)
+        stmt = stmt.join(risk, (risk.patient_id == models.Patient.id) & (risk.risk_factor == name))
+    for name in segment.goals:
+        goal = aliased(models.PatientGoal)
+        stmt = stmt.join(goal, (goal.patient_id == models.Patient.id) & (goal.goal == name))
+    for name in segment.conditions:
+        link = models.patient_conditions.alias()
+        condition_id = select(models.Condition.id).where(models.Condition.name == name).scalar_subquery()
+        stmt = stmt.join(link, (link.c.patient_id == models.Patient.id) & (link.c.condition_id == condition_id))
+    if segment.min_age is not None:
+        stmt = stmt.where(models.Patient.age >= segment.min_age)
+    if segment.max_age is not None:
+        stmt = stmt.where(models.Patient.age <= segment.max_age)
+    return stmt
+
+def get_segment_patient_ids(db: Session, segment: Segment) -> List[int]:
+    """Get the IDs of every patient in a segment"""
+    return db.scalars(segment_query(segment).order_by(models.Patient.id)).all()
+
+def get_segment_patients(db: Session, segment: Segment, limit: Optional[int] = None) -> List[models.Patient]:
+    """Get the patients in a segment, newest first"""
+    ids = segment_query(segment).order_by(models.Patient.id.desc())
+    if limit is not None:
+        ids = ids.limit(limit)
+    return db.scalars(
+        select(models.Patient).where(models.Patient.id.in_(ids)).order_by(models.Patient.id.desc())
+    ).all()
+
+def count_segment(db: Session, segment: Segment) -> int:
+    """Count the patients in a segment"""
+    return db.execute(select(func.count()).select_from(segment_query(segment).subquery())).scalar()
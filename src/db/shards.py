@@ -0,0 +1,138 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session, sessionmaker
+from .database import Base, PROJECT_ROOT, SessionLocal, create_sqlite_engine, engine
+from . import crud
+
+# The existing single database keeps serving the default clinic
+DEFAULT_CLINIC = "default"
+SHARD_DIR = os.environ.get("EAM_SHARD_DIR", os.path.join(PROJECT_ROOT, 'data', 'clinics'))
+FAN_OUT_WORKERS = 8
+
+_CLINIC_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+class ShardRegistry:
+    """Map clinic IDs to their own SQLite file, engine and session factory"""
+
+    def __init__(self, shard_dir: str = SHARD_DIR):
+        self.shard_dir = shard_dir
+        self._lock = threading.Lock()
+        self._engines = {DEFAULT_CLINIC: engine}
+        self._sessionmakers = {DEFAULT_CLINIC: SessionLocal}
+
+    def path_for(self, clinic_id: str) -> str:
+        if not _CLINIC_ID.match(clinic_id):
+            raise ValueError(f"Invalid clinic ID: {clinic_id!r}")
+        return os.path.join(self.shard_dir, f"{clinic_id}.db")
+
+    def engine(self, clinic_id: str = DEFAULT_CLINIC):
+        """Get the clinic's engine, creating its database file on first use"""
+        shard_engine = self._engines.get(clinic_id)
+        if shard_engine is not None:
+            return shard_engine
+        with self._lock:
+            if clinic_id not in self._engines:
+                path = self.path_for(clinic_id)
+                os.makedirs(self.shard_dir, exist_ok=True)
+                shard_engine = create_sqlite_engine(f"sqlite:///{path}")
+                Base.metadata.create_all(bind=shard_engine)
+                self._sessionmakers[clinic_id] = sessionmaker(
+                    autocommit=False, autoflush=False, bind=shard_engine
+                )
+                self._engines[clinic_id] = shard_engine
+            return self._engines[clinic_id]
+
+    def sessionmaker(self, clinic_id: str = DEFAULT_CLINIC) -> sessionmaker:
+        self.engine(clinic_id)
+        return self._sessionmakers[clinic_id]
+
+    def clinic_ids(self) -> List[str]:
+        """The default clinic plus every shard registered or found on disk"""
+        found = set(self._engines)
+        if os.path.isdir(self.shard_dir):
+            found.update(
+                name[:-3] for name in os.listdir(self.shard_dir)
+                if name.endswith(".db") and _CLINIC_ID.match(name[:-3])
+            )
+        return [DEFAULT_CLINIC] + sorted(found - {DEFAULT_CLINIC})
+
+    def shard_version(self, clinic_id: str = DEFAULT_CLINIC) -> Tuple:
+        """Modification time and size of the clinic's database and WAL files.
+
+        Every commit touches one of them, so this changes whenever the shard
+        does, without opening a connection.
+        """
+        path = self.engine(clinic_id).url.database
+        version = []
+        for name in (path, path + "-wal"):
+            if os.path.exists(name):
+                stat = os.stat(name)
+                version.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(version)
+
+    @contextmanager
+    def session(self, clinic_id: str = DEFAULT_CLINIC):
+        """Session bound to one clinic's shard"""
+        db = self.sessionmaker(clinic_id)()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def dispose(self) -> None:
+        with self._lock:
+            for clinic_id, shard_engine in list(self._engines.items()):
+                if clinic_id != DEFAULT_CLINIC:
+                    shard_engine.dispose()
+                    del self._engines[clinic_id]
+                    del self._sessionmakers[clinic_id]
+
+registry = ShardRegistry()
+
+def fan_out(
+    fn: Callable[[Session], Any],
+    clinic_ids: Optional[Iterable[str]] = None,
+    max_workers: int = FAN_OUT_WORKERS
+) -> Dict[str, Any]:
+    """Run fn(db) against every clinic shard concurrently and return results by clinic"""
+    clinic_ids = list(clinic_ids) if clinic_ids is not None else registry.clinic_ids()
+
+    def run(clinic_id):
+        with registry.session(clinic_id) as db:
+            return fn(db)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(clinic_ids)))) as executor:
+        return dict(zip(clinic_ids, executor.map(run, clinic_ids)))
+
+def cross_clinic_counts(clinic_ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Patient, prescription and session counts per clinic plus the overall total"""
+    per_clinic = fan_out(crud.get_record_counts, clinic_ids)
+    total = {key: sum(counts[key] for counts in per_clinic.values()) for key in crud.RECORD_COUNT_KEYS}
+    return {"clinics": per_clinic, "total": total}
+
+def cross_clinic_cohorts(clinic_ids: Optional[Iterable[str]] = None) -> List[dict]:
+    """Age-band cohort aggregates merged across every clinic"""
+    merged = {}
+    for cohorts in fan_out(crud.get_cohort_totals, clinic_ids).values():
+        for row in cohorts:
+            band = merged.setdefault(row["age_band"], {
+                "age_band": row["age_band"], "patients": 0, "sessions": 0,
+                "duration_sum": 0, "pain_sum": 0
+            })
+            for key in ("patients", "sessions", "duration_sum", "pain_sum"):
+                band[key] += row[key]
+
+    return [
+        {
+            "age_band": band["age_band"],
+            "patients": band["patients"],
+            "sessions": band["sessions"],
+            "avg_duration": band["duration_sum"] / band["sessions"] if band["sessions"] else None,
+            "avg_pain": band["pain_sum"] / band["sessions"] if band["sessions"] else None,
+        }
+        for band in sorted(merged.values(), key=lambda band: band["age_band"])
+    ]
@@ -0,0 +1,149 @@
+"""Offline capture of progress sessions with batched sync to the clinic database.
+
+Sessions are written to a small SQLite journal on the device, each under a
+client-generated ID, and later shipped in batches to crud.merge_progress_batch.
+Because the server remembers every client ID it has merged, a batch that was
+committed but never acknowledged (e.g. the connection dropped) can simply be
+sent again.
+"""
+import os
+import uuid
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, bindparam, create_engine, func, insert, select, update
+)
+from sqlalchemy.orm import Session
+from src.db import crud
+
+# Sessions sent per sync transaction
+SYNC_BATCH_SIZE = 2000
+
+# Journal entry states
+PENDING = "pending"
+SYNCED = "synced"
+REJECTED = "rejected"
+
+# The journal has its own schema; it never shares a file with the clinic database
+journal_metadata = MetaData()
+
+journal_entries = Table(
+    'journal_entries', journal_metadata,
+    Column('seq', Integer, primary_key=True),  # capture order
+    Column('client_id', String, unique=True, nullable=False),
+    Column('patient_id', Integer, nullable=False),
+    Column('prescription_id', Integer, nullable=False),
+    Column('date', String, nullable=False),  # ISO format, as shipped
+    Column('duration', Integer),
+    Column('difficulty_level', Integer),
+    Column('pain_level', Integer),
+    Column('notes', String),
+    Column('status', String, nullable=False, default=PENDING, index=True),
+    Column('server_id', Integer),
+    Column('error', String),
+    Column('recorded_at', DateTime, default=datetime.utcnow),
+    Column('synced_at', DateTime)
+)
+
+class ProgressJournal:
+    """Local SQLite journal of progress sessions awaiting sync"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.engine = create_engine(f"sqlite:///{path}")
+        journal_metadata.create_all(self.engine)
+
+    def record(
+        self,
+        patient_id: int,
+        prescription_id: int,
+        date: date,
+        duration: int,
+        difficulty_level: int,
+        pain_level: int,
+        notes: str = ""
+    ) -> str:
+        """Capture a session locally and return its client ID"""
+        client_id = uuid.uuid4().hex
+        if not isinstance(date, datetime):
+            date = datetime.combine(date, datetime.min.time())
+        with self.engine.begin() as conn:
+            conn.execute(insert(journal_entries).values(
+                client_id=client_id,
+                patient_id=patient_id,
+                prescription_id=prescription_id,
+                date=date.isoformat(),
+                duration=duration,
+                difficulty_level=difficulty_level,
+                pain_level=pain_level,
+                notes=notes,
+                status=PENDING
+            ))
+        return client_id
+
+    def pending(self, limit: Optional[int] = None) -> List[dict]:
+        """Unsynced sessions in capture order, shaped for crud.merge_progress_batch"""
+        stmt = select(
+            journal_entries.c.client_id, *[journal_entries.c[field] for field in crud.SYNC_FIELDS]
+        ).where(journal_entries.c.status == PENDING).order_by(journal_entries.c.seq)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        with self.engine.connect() as conn:
+            return [dict(row._mapping) for row in conn.execute(stmt)]
+
+    def acknowledge(self, result: dict) -> None:
+        """Apply a merge result: accepted and duplicate entries are synced, the rest rejected"""
+        now = datetime.utcnow()
+        synced = {**result["duplicates"], **result["accepted"]}
+        with self.engine.begin() as conn:
+            if synced:
+                conn.execute(
+                    update(journal_entries)
+                    .where(journal_entries.c.client_id == bindparam("b_client_id"))
+                    .values(status=SYNCED, server_id=bindparam("b_server_id"), synced_at=now),
+                    [{"b_client_id": client_id, "b_server_id": server_id} for client_id, server_id in synced.items()]
+                )
+            if result["rejected"]:
+                conn.execute(
+                    update(journal_entries)
+                    .where(journal_entries.c.client_id == bindparam("b_client_id"))
+                    .values(status=REJECTED, error=bindparam("b_error")),
+                    [{"b_client_id": client_id, "b_error": error} for client_id, error in result["rejected"].items()]
+                )
+
+    def counts(self) -> Dict[str, int]:
+        """Number of journal entries in each state"""
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(journal_entries.c.status, func.count()).group_by(journal_entries.c.status)
+            ).all()
+        counts = {PENDING: 0, SYNCED: 0, REJECTED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def dispose(self) -> None:
+        self.engine.dispose()
+
+def sync_journal(
+    journal: ProgressJournal,
+    session_factory: Callable[[], Session],
+    batch_size: int = SYNC_BATCH_SIZE
+) -> Dict[str, int]:
+    """Ship every pending session to the server in batches; returns totals by outcome.
+
+    Each batch is merged in one server transaction and only then acknowledged in the
+    journal, so an interrupted sync leaves the batch pending and it is resent.
+    """
+    totals = {"accepted": 0, "duplicates": 0, "rejected": 0, "batches": 0}
+    while True:
+        batch = journal.pending(batch_size)
+        if not batch:
+            return totals
+        with session_factory() as db:
+            result = crud.merge_progress_batch(db, batch)
+        journal.acknowledge(result)
+        for outcome in ("accepted", "duplicates", "rejected"):
+            totals[outcome] += len(result[outcome])
+        totals["batches"] += 1
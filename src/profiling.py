@@ -0,0 +1,185 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from functools import wraps
+from typing import Callable, List, Optional, Tuple
+import streamlit as st
+from src.db.database import query_count
+
+# Switch profiling on with EAM_PROFILE=1 or by opening the app with ?profile=1
+PROFILE_ENV_VAR = "EAM_PROFILE"
+PROFILE_QUERY_PARAM = "profile"
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_DIR = os.environ.get("EAM_PROFILE_DIR", os.path.join(PROJECT_ROOT, "data", "profiles"))
+MAX_PROFILE_RUNS = 50
+TOP_N = 15
+
+# Profile of the rerun currently executing on this thread
+_active = threading.local()
+
+# tracemalloc is process-wide while reruns run on concurrent threads: the first
+# profiled rerun starts tracing and the last one to finish stops it
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+def _acquire_tracing() -> None:
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+def _release_tracing() -> Optional[tracemalloc.Snapshot]:
+    """Snapshot allocations (None if tracing was stopped elsewhere) and drop this run's hold on tracing"""
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+    return snapshot
+
+def profiling_enabled() -> bool:
+    """Check the environment variable and the page's query parameters"""
+    if os.environ.get(PROFILE_ENV_VAR, "0") not in ("", "0", "false"):
+        return True
+    try:
+        return st.query_params.get(PROFILE_QUERY_PARAM, "0") not in ("", "0", "false")
+    except Exception:
+        return False
+
+def _rotate(directory: str, keep: int) -> None:
+    """Delete all but the newest `keep` profiled runs"""
+    runs = sorted({name.rsplit(".", 1)[0] for name in os.listdir(directory)})
+    for stale in runs[:-keep] if len(runs) > keep else []:
+        for suffix in (".prof", ".txt"):
+            path = os.path.join(directory, stale + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+def _write_report(
+    name: str,
+    profiler: Optional[cProfile.Profile],
+    snapshot: Optional[tracemalloc.Snapshot],
+    sections: List[Tuple[str, float]],
+    elapsed: float
+) -> Tuple[str, str]:
+    """Write the .prof stats (if any) and a text summary for one rerun, return (path, summary)"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stem = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{name}"
+    report_path = os.path.join(PROFILE_DIR, stem + ".txt")
+
+    out = io.StringIO()
+    out.write(f"{name}: {elapsed * 1000:.1f} ms\n")
+    for section, seconds in sections:
+        out.write(f"  {section}: {seconds * 1000:.1f} ms\n")
+
+    if profiler is not None:
+        report_path = os.path.join(PROFILE_DIR, stem + ".prof")
+        profiler.dump_stats(report_path)
+        out.write(f"\nTop {TOP_N} functions by cumulative time\n")
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(TOP_N)
+    else:
+        out.write("\nNo function profile: another profiled rerun held the profiler\n")
+
+    if snapshot is not None:
+        # Overlapping profiled reruns share the trace, so this includes their allocations too
+        out.write(f"Top {TOP_N} allocations\n")
+        for stat in snapshot.statistics("lineno")[:TOP_N]:
+            out.write(f"  {stat}\n")
+
+    summary = out.getvalue()
+    with open(os.path.join(PROFILE_DIR, stem + ".txt"), "w") as f:
+        f.write(summary)
+    _rotate(PROFILE_DIR, MAX_PROFILE_RUNS)
+    return report_path, summary
+
+def profiled(fn: Callable) -> Callable:
+    """Profile a page render with cProfile and tracemalloc when profiling is enabled.
+
+    The outermost profiled call of a rerun owns the profiler; nested profiled
+    calls (the show_* pages inside main) are recorded as timed sections.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not profiling_enabled():
+            return fn(*args, **kwargs)
+
+        run = getattr(_active, "run", None)
+        if run is not None:
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                run["sections"].append((fn.__name__, time.perf_counter() - started))
+
+        run = _active.run = {"sections": []}
+        _acquire_tracing()
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler per process; an overlapping
+            # rerun still reports its timings and allocations
+            profiler = None
+        started = time.perf_counter()
+        completed = False
+        try:
+            result = fn(*args, **kwargs)
+            completed = True
+            return result
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            elapsed = time.perf_counter() - started
+            snapshot = _release_tracing()
+            _active.run = None
+            report_path, summary = _write_report(fn.__name__, profiler, snapshot, run["sections"], elapsed)
+            # Skip rendering while st.rerun() or st.stop() is unwinding the script
+            if completed:
+                with st.expander(f"Profile: {fn.__name__} ({elapsed * 1000:.0f} ms)"):
+                    st.caption(report_path)
+                    st.code(summary)
+
+    return wrapper
+
+# Per-scope rerun and query counts, kept in session state
+RUN_STATS_KEY = "run_stats"
+
+def counted(fn: Callable) -> Callable:
+    """Count how often a page or fragment runs, how long it takes and how many queries it sends.
+
+    Stats accumulate in st.session_state["run_stats"][fn.__name__]; with profiling
+    enabled each run also prints its own counts under the rendered output.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        stats = st.session_state.setdefault(RUN_STATS_KEY, {}).setdefault(
+            fn.__name__, {"runs": 0, "queries": 0, "last_queries": 0, "seconds": 0.0}
+        )
+        started = query_count()
+        started_at = time.perf_counter()
+        completed = False
+        try:
+            result = fn(*args, **kwargs)
+            completed = True
+            return result
+        finally:
+            queries = query_count() - started
+            stats["runs"] += 1
+            stats["queries"] += queries
+            stats["last_queries"] = queries
+            stats["seconds"] += time.perf_counter() - started_at
+            if completed and profiling_enabled():
+                st.caption(f"{fn.__name__}: run {stats['runs']}, {queries} queries")
+
+    return wrapper
@@ -0,0 +1,121 @@
+import math
+from datetime import date, datetime
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, MutableMapping, Optional
+from sqlalchemy.orm import Session
+from src.db import crud, models
+
+# Metrics summarized on the progress overview
+TRACKED_METRICS = ["duration", "pain_level", "difficulty_level"]
+
+@dataclass
+class RunningStats:
+    """Mean and sample standard deviation updated one value at a time (Welford)"""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def update(self, value: Optional[float]) -> None:
+        if value is None:
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def std(self) -> float:
+        # Sample standard deviation, matching pandas' default ddof=1
+        if self.count < 2:
+            return math.nan
+        return math.sqrt(self.m2 / (self.count - 1))
+
+@dataclass
+class ProgressFrame:
+    """A patient's progress rows and running stats, kept in session state between reruns"""
+    patient_id: int
+    start: Optional[date] = None
+    end: Optional[date] = None
+    rows: List[dict] = field(default_factory=list)
+    stats: Dict[str, RunningStats] = field(
+        default_factory=lambda: {metric: RunningStats() for metric in TRACKED_METRICS}
+    )
+    max_id: int = 0
+    count: int = 0
+    _df: object = None
+
+    @classmethod
+    def from_entries(
+        cls,
+        patient_id: int,
+        entries: Iterable[models.Progress],
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> "ProgressFrame":
+        frame = cls(patient_id=patient_id, start=start, end=end)
+        for entry in entries:
+            frame.append(entry)
+        return frame
+
+    def covers(self, day) -> bool:
+        """Whether a session on `day` falls inside this frame's date window"""
+        if isinstance(day, datetime):
+            day = day.date()
+        return (self.start is None or day >= self.start) and (self.end is None or day <= self.end)
+
+    def append(self, entry: models.Progress) -> None:
+        """Add one progress entry in O(1)"""
+        row = {
+            'id': entry.id,
+            'date': entry.date,
+            'duration': entry.duration,
+            'difficulty_level': entry.difficulty_level,
+            'pain_level': entry.pain_level,
+            'notes': entry.notes
+        }
+        self.rows.append(row)
+        for metric in TRACKED_METRICS:
+            self.stats[metric].update(row[metric])
+        self.max_id = max(self.max_id, entry.id)
+        self.count += 1
+        self._df = None
+
+    def is_current(self, max_id: int, count: int) -> bool:
+        return self.max_id == max_id and self.count == count
+
+    def dataframe(self):
+        """DataFrame of all rows, rebuilt only after new entries arrive"""
+        if self._df is None:
+            import pandas as pd
+            self._df = pd.DataFrame(self.rows)
+        return self._df
+
+def get_progress_frame(
+    db: Session,
+    patient_id: int,
+    cache: MutableMapping[int, ProgressFrame],
+    start: Optional[date] = None,
+    end: Optional[date] = None
+) -> ProgressFrame:
+    """Return the cached frame for a date window, reloading only if the window or history changed"""
+    frame = cache.get(patient_id)
+    max_id, count = crud.get_progress_version(db, patient_id, start, end)
+    if frame is None or (frame.start, frame.end) != (start, end) or not frame.is_current(max_id, count):
+        # Stream the window in chunks rather than materialising it as one result
+        entries = (
+            entry
+            for chunk in crud.iter_patient_progress(db, patient_id, start, end)
+            for entry in chunk
+        )
+        frame = ProgressFrame.from_entries(patient_id, entries, start, end)
+        cache[patient_id] = frame
+    return frame
+
+def record_in_frame(
+    cache: MutableMapping[int, ProgressFrame],
+    entry: models.Progress
+) -> None:
+    """Fold a freshly recorded entry into the patient's cached frame if it falls in its window"""
+    frame = cache.get(entry.patient_id)
+    if frame is not None and entry.id > frame.max_id and frame.covers(entry.date):
+        frame.append(entry)
@@ -0,0 +1,156 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence
+
+# Goals offered on the patient profile page, mapped to target-area keywords
+GOAL_KEYWORDS: Dict[str, List[str]] = {
+    "Improve Balance": ["balance", "coordination", "stability", "core"],
+    "Reduce Pain": ["pain", "flexibility", "mobility"],
+    "Increase Strength": ["strength", "full body"],
+    "Weight Loss": ["weight", "cardiovascular", "metabolic"],
+}
+
+# Difficulty labels used by the app library and mock data
+DIFFICULTY_RANKS: Dict[str, int] = {
+    "beginner": 0,
+    "moderate": 1,
+    "intermediate": 1,
+    "advanced": 2,
+}
+
+# Score weights
+CONDITION_WEIGHT = 1.0
+GOAL_WEIGHT = 0.5
+
+@dataclass
+class ExerciseCatalog:
+    """Exercise catalog with a precomputed exercise x feature matrix"""
+    exercises: List[Any]
+    conditions: List[str]
+    goals: List[str]
+    features: np.ndarray  # (n_exercises, n_conditions + n_goals)
+    difficulty: np.ndarray  # (n_exercises,)
+
+    @property
+    def condition_matrix(self) -> np.ndarray:
+        return self.features[:, :len(self.conditions)]
+
+    @property
+    def goal_matrix(self) -> np.ndarray:
+        return self.features[:, len(self.conditions):]
+
+def build_catalog(condition_exercises: Dict[str, Sequence[Any]]) -> ExerciseCatalog:
+    """Build a deduplicated catalog from a condition -> exercises mapping"""
+    conditions = list(condition_exercises.keys())
+    goals = list(GOAL_KEYWORDS.keys())
+
+    exercises: List[Any] = []
+    index: Dict[str, int] = {}
+    memberships: List[tuple] = []
+    for cond_idx, condition in enumerate(conditions):
+        for exercise in condition_exercises[condition]:
+            if exercise.name not in index:
+                index[exercise.name] = len(exercises)
+                exercises.append(exercise)
+            memberships.append((index[exercise.name], cond_idx))
+
+    features = np.zeros((len(exercises), len(conditions) + len(goals)), dtype=np.float32)
+    for ex_idx, cond_idx in memberships:
+        features[ex_idx, cond_idx] = 1.0
+
+    for ex_idx, exercise in enumerate(exercises):
+        areas = [area.lower() for area in exercise.target_areas]
+        for goal_idx, goal in enumerate(goals):
+            if any(keyword in area for keyword in GOAL_KEYWORDS[goal] for area in areas):
+                features[ex_idx, len(conditions) + goal_idx] = 1.0
+
+    difficulty = np.array(
+        [DIFFICULTY_RANKS.get(ex.difficulty_level.lower(), 1) for ex in exercises],
+        dtype=np.int8
+    )
+
+    return ExerciseCatalog(
+        exercises=exercises,
+        conditions=conditions,
+        goals=goals,
+        features=features,
+        difficulty=difficulty
+    )
+
+def max_difficulty_for_age(ages: np.ndarray) -> np.ndarray:
+    """Highest suitable difficulty rank for each age"""
+    ages = np.asarray(ages)
+    return np.select([ages >= 80, ages >= 65], [0, 1], default=2)
+
+def _one_hot(selected: Sequence[Sequence[str]], vocabulary: List[str]) -> np.ndarray:
+    """Encode a list of selections per patient as a (n_patients, n_vocabulary) matrix"""
+    lookup = {name: i for i, name in enumerate(vocabulary)}
+    matrix = np.zeros((len(selected), len(vocabulary)), dtype=np.float32)
+    for row, names in enumerate(selected):
+        cols = [lookup[name] for name in names if name in lookup]
+        matrix[row, cols] = 1.0
+    return matrix
+
+def score_exercises(
+    catalog: ExerciseCatalog,
+    conditions: Sequence[Sequence[str]],
+    goals: Sequence[Sequence[str]],
+    ages: Sequence[int]
+) -> np.ndarray:
+    """Score every catalog exercise for every patient, shape (n_patients, n_exercises).
+
+    Each difficulty level above the patient's age limit costs more than any
+    condition and goal matches can add, so exercises within the limit always
+    rank first and harder ones only fill the remaining places, closest first.
+    Exercises that match none of a patient's conditions score -inf.
+    """
+    condition_hits = _one_hot(conditions, catalog.conditions) @ catalog.condition_matrix.T
+    goal_hits = _one_hot(goals, catalog.goals) @ catalog.goal_matrix.T
+
+    levels_over = np.maximum(catalog.difficulty[None, :] - max_difficulty_for_age(ages)[:, None], 0)
+    level_penalty = CONDITION_WEIGHT * len(catalog.conditions) + GOAL_WEIGHT * len(catalog.goals) + 1.0
+
+    scores = (
+        CONDITION_WEIGHT * condition_hits
+        + GOAL_WEIGHT * goal_hits
+        - level_penalty * levels_over
+    )
+    return np.where(condition_hits > 0, scores, -np.inf)
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best scores per row, best first"""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.intp)
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+def recommend_exercises_bulk(
+    catalog: ExerciseCatalog,
+    conditions: Sequence[Sequence[str]],
+    goals: Sequence[Sequence[str]],
+    ages: Sequence[int],
+    top_k: int = 5
+) -> List[List[Any]]:
+    """Deduplicated top-k exercises for many patients in one vectorized pass"""
+    scores = score_exercises(catalog, conditions, goals, ages)
+    indices = top_k_indices(scores, top_k)
+    return [
+        [catalog.exercises[i] for i in row if np.isfinite(scores[p, i])]
+        for p, row in enumerate(indices)
+    ]
+
+def recommend_exercises(
+    catalog: ExerciseCatalog,
+    conditions: Sequence[str],
+    goals: Sequence[str],
+    age: int,
+    top_k: int = 5
+) -> List[Any]:
+    """Deduplicated top-k exercises for a single patient"""
+    return recommend_exercises_bulk(catalog, [conditions], [goals], [age], top_k)[0]
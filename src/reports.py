@@ -0,0 +1,217 @@
+"""Batch generation of static per-patient progress reports.
+
+    python -m src.reports --out data/reports
+"""
+import argparse
+import html
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from itertools import groupby
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from src.db.database import PROJECT_ROOT
+from src.db import crud
+
+REPORT_DIR = os.path.join(PROJECT_ROOT, 'data', 'reports')
+MANIFEST_FILE = 'manifest.json'
+REPORT_METRICS = ['duration', 'pain_level', 'difficulty_level']
+
+REPORT_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Progress report: {name}</title>
+{scripts}
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: right; }}
+</style>
+</head>
+<body>
+<h1>Progress report: {name}</h1>
+<p>Patient ID {patient_id} &middot; {sessions} sessions &middot; generated {generated}</p>
+{content}
+</body>
+</html>
+"""
+
+PROGRESS_SECTION = """<h2>Summary</h2>
+{stats_table}
+<h2>Progress over time</h2>
+<div id="charts"></div>
+<script type="application/json" id="spec">{spec}</script>
+<script>
+vegaEmbed("#charts", JSON.parse(document.getElementById("spec").textContent));
+</script>"""
+
+NO_SESSIONS_SECTION = "<p>No sessions recorded yet.</p>"
+
+CDN_SCRIPT = '<script src="https://cdn.jsdelivr.net/npm/{package}@{version}"></script>'
+
+def write_chart_runtime(out_dir: str) -> str:
+    """Provide the Vega runtime matching the installed Altair's specs; return the script tags.
+
+    With vl-convert installed the bundle (~900 KB) is written once per output
+    directory and version, and every report links it by relative path, so the
+    reports still open offline. Otherwise it is loaded from the CDN at the same
+    versions.
+    """
+    import altair as alt
+    try:
+        import vl_convert
+    except ImportError:
+        return "\n".join(
+            CDN_SCRIPT.format(package=package, version=version)
+            for package, version in [
+                ("vega", alt.VEGA_VERSION),
+                ("vega-lite", alt.VEGALITE_VERSION),
+                ("vega-embed", alt.VEGAEMBED_VERSION)
+            ]
+        )
+    # vl-convert names bundles by Vega-Lite minor version, e.g. 'v6_4'
+    vl_version = "v" + "_".join(alt.VEGALITE_VERSION.split(".")[:2])
+    runtime_file = f"vega-runtime-{vl_version}.js"
+    path = os.path.join(out_dir, runtime_file)
+    if not os.path.exists(path):
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(vl_convert.javascript_bundle(vl_version=vl_version))
+        os.replace(path + '.tmp', path)
+    return f'<script src="{runtime_file}"></script>'
+
+def load_progress_by_patient(db: Session) -> Dict[int, dict]:
+    """Group every progress row by patient from a single bulk read; patients without sessions get no rows"""
+    patients = {}
+    for patient_id, rows in groupby(crud.get_all_progress_rows(db), key=lambda row: row.patient_id):
+        rows = list(rows)
+        patients[patient_id] = {
+            'name': rows[0].name,
+            'rows': [
+                {
+                    'id': row.id,
+                    'date': row.date,
+                    'duration': row.duration,
+                    'difficulty_level': row.difficulty_level,
+                    'pain_level': row.pain_level,
+                    'notes': row.notes
+                }
+                for row in rows if row.id is not None
+            ]
+        }
+    return patients
+
+def render_report(patient_id: int, name: str, rows: List[dict], scripts: str) -> str:
+    """Render one HTML report with the app's chart builders, loading the runtime via `scripts`"""
+    header = {
+        'name': html.escape(name),
+        'patient_id': patient_id,
+        'sessions': len(rows),
+        'generated': datetime.now().strftime('%Y-%m-%d %H:%M')
+    }
+    if not rows:
+        return REPORT_TEMPLATE.format(**header, scripts='', content=NO_SESSIONS_SECTION)
+
+    import altair as alt
+    import pandas as pd
+    from src.visualizations import build_duration_chart, build_metrics_charts
+
+    df = pd.DataFrame(rows)
+    pain_line, difficulty_line = build_metrics_charts(df)
+    with alt.data_transformers.disable_max_rows():
+        spec = alt.vconcat(build_duration_chart(df), pain_line, difficulty_line).to_json(indent=None)
+
+    stats = df[REPORT_METRICS].agg(['count', 'mean', 'std', 'min', 'max']).round(2)
+    content = PROGRESS_SECTION.format(
+        stats_table=stats.to_html(),
+        # Keep the embedded JSON from closing the script element early
+        spec=spec.replace('</', '<\\/')
+    )
+    return REPORT_TEMPLATE.format(**header, scripts=scripts, content=content)
+
+def write_report(out_dir: str, patient_id: int, name: str, rows: List[dict], scripts: str) -> str:
+    """Render and write one report (runs in a worker process)"""
+    path = os.path.join(out_dir, f"patient_{patient_id}.html")
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(render_report(patient_id, name, rows, scripts))
+    os.replace(tmp_path, path)
+    return path
+
+def _load_manifest(out_dir: str) -> Dict[str, dict]:
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def _save_manifest(out_dir: str, manifest: Dict[str, dict]) -> None:
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+def generate_reports(
+    db: Session,
+    out_dir: str = REPORT_DIR,
+    max_workers: Optional[int] = None,
+    force: bool = False
+) -> dict:
+    """Write a report for every patient, skipping those with nothing new"""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {} if force else _load_manifest(out_dir)
+    patients = load_progress_by_patient(db)
+
+    pending = {}
+    for patient_id, patient in patients.items():
+        version = {
+            'max_id': patient['rows'][-1]['id'] if patient['rows'] else None,
+            'count': len(patient['rows'])
+        }
+        if manifest.get(str(patient_id)) != version:
+            pending[patient_id] = version
+
+    written = []
+    if pending:
+        # Built once here rather than in every worker; reports share the one runtime file
+        scripts = write_chart_runtime(out_dir)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    write_report, out_dir, patient_id, patients[patient_id]['name'], patients[patient_id]['rows'],
+                    scripts
+                ): patient_id
+                for patient_id in pending
+            }
+            for future in as_completed(futures):
+                patient_id = futures[future]
+                written.append(future.result())
+                # Record each finished report so an interrupted run resumes where it stopped
+                manifest[str(patient_id)] = pending[patient_id]
+                _save_manifest(out_dir, manifest)
+
+    return {
+        'patients': len(patients),
+        'written': len(written),
+        'skipped': len(patients) - len(pending),
+        'out_dir': out_dir
+    }
+
+def main():
+    from src.db.shards import DEFAULT_CLINIC, registry
+
+    parser = argparse.ArgumentParser(description="Generate weekly per-patient progress reports")
+    parser.add_argument("--out", default=REPORT_DIR)
+    parser.add_argument("--clinic", default=DEFAULT_CLINIC)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="Regenerate every report")
+    args = parser.parse_args()
+
+    with registry.session(args.clinic) as db:
+        summary = generate_reports(db, args.out, args.workers, args.force)
+    print(f"{summary['written']} reports written, {summary['skipped']} unchanged "
+          f"({summary['patients']} patients) in {summary['out_dir']}")
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 from datetime import datetime, timedelta
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from .db.models import Progress
 
 def create_progress_dataframe(progress_entries: List[Progress]) -> pd.DataFrame:
@@ -20,13 +20,9 @@ def create_progress_dataframe(progress_entries: List[Progress]) -> pd.DataFrame:
     
     return pd.DataFrame(data)
 
-def plot_duration_chart(df: pd.DataFrame) -> None:
-    """Plot exercise duration over time"""
-    if df.empty:
-        st.info("No duration data available yet")
-        return
-    
-    chart = alt.Chart(df).mark_line(point=True).encode(
+def build_duration_chart(df: pd.DataFrame) -> alt.Chart:
+    """Build the exercise duration over time chart"""
+    return alt.Chart(df).mark_line(point=True).encode(
         x=alt.X('date:T', title='Date'),
         y=alt.Y('duration:Q', title='Duration (minutes)'),
         tooltip=['date', 'duration', 'notes']
@@ -35,15 +31,9 @@ def plot_duration_chart(df: pd.DataFrame) -> None:
         width=600,
         height=300
     )
-    
-    st.altair_chart(chart, use_container_width=True)
 
-def plot_metrics_chart(df: pd.DataFrame) -> None:
-    """Plot pain and difficulty levels over time"""
-    if df.empty:
-        st.info("No metrics data available yet")
-        return
-    
+def build_metrics_charts(df: pd.DataFrame) -> Tuple[alt.Chart, alt.Chart]:
+    """Build the pain level and difficulty level over time charts"""
     # Create a base chart for both metrics
     base = alt.Chart(df).encode(
         x=alt.X('date:T', title='Date')
@@ -68,49 +58,81 @@ def plot_metrics_chart(df: pd.DataFrame) -> None:
         title='Difficulty Level Over Time'
     )
     
+    return pain_line, difficulty_line
+
+def plot_duration_chart(df: pd.DataFrame) -> None:
+    """Plot exercise duration over time"""
+    if df.empty:
+        st.info("No duration data available yet")
+        return
+    
+    st.altair_chart(build_duration_chart(df), use_container_width=True)
+
+def plot_metrics_chart(df: pd.DataFrame) -> None:
+    """Plot pain and difficulty levels over time"""
+    if df.empty:
+        st.info("No metrics data available yet")
+        return
+    
+    pain_line, difficulty_line = build_metrics_charts(df)
+    
     # Display charts
     st.altair_chart(pain_line, use_container_width=True)
     st.altair_chart(difficulty_line, use_container_width=True)
 
-def show_progress_stats(df: pd.DataFrame) -> None:
-    """Show summary statistics for progress"""
+def show_progress_stats(df: pd.DataFrame, stats: Optional[Dict] = None) -> None:
+    """Show summary statistics for progress.
+
+    `stats` maps a metric to precomputed running stats (with `mean` and `std`);
+    metrics missing from it are computed from the DataFrame.
+    """
     if df.empty:
         st.info("No statistics available yet")
         return
     
+    def summary(metric):
+        if stats and metric in stats:
+            return stats[metric].mean, stats[metric].std
+        return df[metric].mean(), df[metric].std()
+    
     col1, col2, col3 = st.columns(3)
     
     with col1:
+        mean, std = summary('duration')
         st.metric(
             "Average Duration",
-            f"{df['duration'].mean():.1f} min",
-            f"{df['duration'].std():.1f} min σ"
+            f"{mean:.1f} min",
+            f"{std:.1f} min σ"
         )
     
     with col2:
+        mean, std = summary('pain_level')
         st.metric(
             "Average Pain Level",
-            f"{df['pain_level'].mean():.1f}",
-            f"{df['pain_level'].std():.1f} σ"
+            f"{mean:.1f}",
+            f"{std:.1f} σ"
         )
     
     with col3:
+        mean, std = summary('difficulty_level')
         st.metric(
             "Average Difficulty",
-            f"{df['difficulty_level'].mean():.1f}",
-            f"{df['difficulty_level'].std():.1f} σ"
+            f"{mean:.1f}",
+            f"{std:.1f} σ"
         )
 
 def display_progress_visualizations(progress_entries: List[Progress]) -> None:
     """Display all progress visualizations"""
-    df = create_progress_dataframe(progress_entries)
-    
+    display_progress_frame(create_progress_dataframe(progress_entries))
+
+def display_progress_frame(df: pd.DataFrame, stats: Optional[Dict] = None) -> None:
+    """Display all progress visualizations for an already built DataFrame"""
     if df.empty:
         st.warning("No progress data available. Record some exercise sessions to see visualizations!")
         return
     
     st.subheader("Progress Overview")
-    show_progress_stats(df)
+    show_progress_stats(df, stats)
     
     st.subheader("Exercise Duration")
     plot_duration_chart(df)